@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      array_board.py
+Authors:        Jeremy Webb
+
+Description:    Many boards at once as rows of an (N, 65) int8 array: white pieces positive, black negative and the
+                last column an off board padding square. The moves every board's side to move may request are counted,
+                drawn and played with a few NumPy operations over all rows, following the recon chess rules like
+                rollout.py with three simplifications: no castling, no en passant and pawns always promote to a
+                queen. The particle filter (belief.py) and sense selection (sense.py) build on it.
+"""
+
+import numpy as np
+import chess
+from tables import ORTHOGONAL, DIAGONAL, RAY_SQUARES, KNIGHT_SQUARES, BACK_RANK_SQUARES
+
+OFF_BOARD = 64  # padding column, counts as one of our own pieces so nothing moves there
+MAX_PIECES = 16
+
+# RAYS[square, direction, k] is the square k + 1 steps away, KNIGHT_TARGETS[square, j] the j-th knight jump. rays
+# have an eighth step that is always off the board, so every ray ends in a blocked square
+RAYS = np.array([[ray + [OFF_BOARD] * (8 - len(ray)) for ray in rays] for rays in RAY_SQUARES] +
+                [[[OFF_BOARD] * 8] * 8], dtype=np.int64)
+KNIGHT_TARGETS = np.array([[OFF_BOARD if target is None else target for target in targets]
+                           for targets in KNIGHT_SQUARES] + [[OFF_BOARD] * 8], dtype=np.int64)
+
+
+def _allowed(code, square, direction, k):
+    piece_type = abs(code)
+    if piece_type == chess.PAWN:
+        forward, captures = (0, (1, 7)) if code > 0 else (4, (3, 5))
+        start_rank = 1 if code > 0 else 6
+        return (direction == forward and (k == 0 or (k == 1 and chess.square_rank(square) == start_rank))) or \
+            (direction in captures and k == 0)
+    if piece_type == chess.BISHOP:
+        return direction in DIAGONAL
+    if piece_type == chess.ROOK:
+        return direction in ORTHOGONAL
+    if piece_type == chess.QUEEN:
+        return True
+    if piece_type == chess.KING:
+        return k == 0
+    return False
+
+
+# ALLOWED[code + 6, square, direction, k] -- whether a piece may request a move along that ray, ignoring other pieces
+ALLOWED = np.array([[[[_allowed(code, square, direction, k) for k in range(8)] for direction in range(8)]
+                     for square in range(65)] for code in range(-6, 7)], dtype=np.bool_)
+LAST_RANK = np.zeros(65, dtype=np.bool_)
+LAST_RANK[list(BACK_RANK_SQUARES)] = True
+
+
+def board_array(board):
+    """
+    :param board: chess.Board -- position to convert
+    :return: np.ndarray -- 64 int8 squares, the piece type for white pieces and minus the piece type for black ones
+    """
+    squares = np.zeros(64, dtype=np.int8)
+    for square, piece in board.piece_map().items():
+        squares[square] = piece.piece_type if piece.color else -piece.piece_type
+    return squares
+
+
+def requested_moves(board, own):
+    """
+    The moves every board's side to move may request, as seen without the opponent's pieces. They are counted per line
+    of each piece: a piece has 16 lines, the 8 ray directions and the 8 knight jumps, and may request the first
+    count squares of a line.
+
+    :param board: np.ndarray -- (n, 65) boards with the off board padding column
+    :param own: np.ndarray -- (n, 65) bool, squares holding a piece of the side to move (and the padding column)
+    :return: Tuple(np.ndarray, np.ndarray) -- (n, 256) move counts of the lines, at piece * 16 + line, and the (n, 16)
+             squares of each board's pieces, padded with the off board square
+    """
+    n = len(board)
+    # flat indexing (row * 65 + square) is much cheaper than fancy indexing with broadcast row indices
+    offsets = np.arange(n)[:, None] * (OFF_BOARD + 1)
+    pieces = np.argsort(~own[:, :64], axis=1, kind='stable')[:, :MAX_PIECES]
+    pieces = np.where(np.arange(MAX_PIECES) < own[:, :64].sum(axis=1)[:, None], pieces, OFF_BOARD)
+    codes = board.take(offsets + pieces).astype(np.int64) + 6
+
+    # a ray is open up to the first step the piece may not take or that holds an own piece
+    blocked = own.take(offsets + RAYS[pieces].reshape(n, -1)).reshape(n, MAX_PIECES, 8, 8)
+    ray_counts = np.argmin(ALLOWED[codes, pieces] & ~blocked, axis=3)
+    knight_counts = (np.abs(codes - 6) == chess.KNIGHT)[:, :, None] & \
+        ~own.take(offsets + KNIGHT_TARGETS[pieces].reshape(n, -1)).reshape(n, MAX_PIECES, 8)
+    return np.concatenate([ray_counts, knight_counts], axis=2).reshape(n, -1), pieces
+
+
+def decode_lines(pieces, lines, k):
+    """
+    :param pieces: np.ndarray -- (m, 16) piece squares of the boards the moves belong to
+    :param lines: np.ndarray -- (m,) piece * 16 + line of every move, see requested_moves
+    :param k: np.ndarray -- (m,) step along the line, 0 for the first square
+    :return: Tuple(np.ndarray, ...) -- from squares, to squares, ray direction and whether it is a ray move
+    """
+    line = lines % 16
+    is_ray = line < 8
+    direction = line % 8
+    from_squares = pieces[np.arange(len(lines)), lines // 16]
+    to_squares = np.where(is_ray, RAYS[from_squares, direction, k], KNIGHT_TARGETS[from_squares, direction])
+    return from_squares, to_squares, direction, is_ray
+
+
+def referee(board, from_squares, to_squares, direction, k, is_ray, side):
+    """
+    What the referee makes of requested moves: slides and pawn double steps stop at the first enemy piece in the way,
+    blocked pawn pushes and pawn diagonals without an enemy piece to capture become passes.
+
+    :param board: np.ndarray -- (m, 65) board of each move
+    :param from_squares: np.ndarray -- the requested moves, as returned by decode_lines, and their ray step k
+    :param side: np.ndarray -- (m,) 1 if white requested the move, -1 for black
+    :return: Tuple(np.ndarray, np.ndarray) -- the square each move ends on and whether it is played at all
+    """
+    m = len(board)
+    rows = np.arange(m)
+    enemy = board * side[:, None] < 0
+    pawn = np.abs(board[rows, from_squares]) == chess.PAWN
+    ray = RAYS[from_squares, direction]  # (m, 8)
+    enemy_on_ray = enemy[rows[:, None], ray] & (np.arange(8) <= k[:, None])
+    first_enemy = np.argmax(enemy_on_ray, axis=1)
+    hit = is_ray & enemy_on_ray.any(axis=1)
+    pushes = pawn & ((direction == 0) | (direction == 4))
+    stopped = np.where(pushes, first_enemy - 1, first_enemy)
+    to_squares = np.where(hit & (stopped >= 0), ray[rows, np.maximum(stopped, 0)], to_squares)
+    passes = (hit & pushes & (stopped < 0)) | (pawn & ~pushes & ~enemy[rows, to_squares])
+    return to_squares, ~passes
+
+
+def sample_moves(board, side, rng, index=None, moves=None):
+    """
+    Draws moves uniformly among the moves the side to move may request and passing, then lets the referee revise
+    them.
+
+    :param board: np.ndarray -- (n, 65) boards
+    :param side: np.ndarray -- (n,) 1 where white is to move, -1 for black
+    :param rng: np.random.Generator -- generator for the moves
+    :param index: np.ndarray -- board of every draw, so moves are generated once for boards drawn from many times.
+                  Defaults to one draw per board
+    :param moves: Tuple(np.ndarray, np.ndarray) -- requested_moves of the boards if they are known already
+    :return: Tuple(np.ndarray, np.ndarray, np.ndarray) -- the draws whose move is played (the others pass), and
+             those moves' from and to squares
+    """
+    if moves is None:
+        own = board * side[:, None] > 0
+        own[:, OFF_BOARD] = True
+        moves = requested_moves(board, own)
+    counts, pieces = moves
+    if index is None:
+        index = np.arange(len(board))
+
+    # uniform among the moves and passing, the last index is the pass
+    ends = np.cumsum(counts, axis=1)
+    picks = (rng.random(len(index)) * (ends[index, -1] + 1)).astype(np.int64)
+    moving = picks < ends[index, -1]
+    rows, picks = np.nonzero(moving)[0], picks[moving]
+    boards = index[rows]
+    lines = (ends[boards] <= picks[:, None]).sum(axis=1)
+    k = picks - ends[boards, lines] + counts[boards, lines]
+    from_squares, to_squares, direction, is_ray = decode_lines(pieces[boards], lines, k)
+    to_squares, played = referee(board[boards], from_squares, to_squares, direction, k, is_ray, side[boards])
+    return rows[played], from_squares[played], to_squares[played]
+
+
+def play_moves(squares, rows, from_squares, to_squares):
+    """
+    Plays moves in place, pawns that reach the last rank become queens.
+
+    :param squares: np.ndarray -- (N, 65) boards
+    :param rows: np.ndarray -- boards to play on, each at most once
+    :return: np.ndarray -- the piece captured by every move, 0 for none
+    """
+    code = squares[rows, from_squares]
+    captured = squares[rows, to_squares]
+    promote = (np.abs(code) == chess.PAWN) & LAST_RANK[to_squares]
+    squares[rows, from_squares] = 0
+    squares[rows, to_squares] = np.where(promote, np.sign(code) * chess.QUEEN, code)
+    return captured
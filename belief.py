@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      belief.py
+Authors:        Jeremy Webb
+
+Description:    Particle filter over the true board for MyAgent. Thousands of weighted candidate boards are kept as
+                rows of an int8 array in the layout of array_board.py and every observation updates all of them with
+                a few array operations: the opponent's move is sampled per particle, sense results and the outcome of
+                our own move reweight the particles, and the set is resampled when the weights collapse onto a few
+                of them. Castling of the opponent and en passant are not tracked.
+"""
+
+import numpy as np
+import chess
+from array_board import RAYS, KNIGHT_TARGETS, OFF_BOARD, DIAGONAL, board_array, requested_moves, sample_moves, \
+    play_moves
+
+
+class Belief:
+    """
+    Weighted candidate boards. Our own pieces are known and identical in every particle, the opponent's differ.
+    """
+
+    def __init__(self, board, color, particles=10000, mismatch=1e-3, resample_fraction=0.5, max_distinct=2048,
+                 seed=None):
+        """
+        :param board: chess.Board -- the known starting position
+        :param color: chess.WHITE/chess.BLACK -- our side
+        :param particles: int -- number of candidate boards
+        :param mismatch: float -- likelihood factor of every observation a particle contradicts. Small but not zero,
+                         so a wrong turn of the filter can be recovered from instead of leaving no particles
+        :param resample_fraction: float -- resample when the effective number of particles drops below this fraction
+        :param max_distinct: int -- most distinct boards the opponent's moves are generated for. With more, the
+                             particles are first resampled from that many of them, the moves drawn afterwards make
+                             them differ again
+        :param seed: int -- seed for sampling, None to seed from the OS
+        """
+        self.color = color
+        self.sign = 1 if color else -1  # sign of our pieces in the arrays
+        self.boards = np.zeros((particles, OFF_BOARD + 1), dtype=np.int8)
+        self.boards[:, :64] = board_array(board)
+        self.weights = np.full(particles, 1.0 / particles)
+        self.mismatch = mismatch
+        self.resample_fraction = resample_fraction
+        self.max_distinct = max_distinct
+        self.rng = np.random.default_rng(seed)
+        self.castling = board.castling_rights & (chess.BB_RANK_1 if color else chess.BB_RANK_8)  # our rook squares
+        self.resamples = 0
+
+    @property
+    def effective_size(self):
+        return 1.0 / np.sum(self.weights ** 2)
+
+    def opponent_moved(self, captured_square):
+        """
+        Advances every particle by one opponent move that agrees with the capture notification.
+
+        :param captured_square: chess.Square -- where the opponent captured one of our pieces, None if nothing was
+        """
+        if captured_square is None:
+            self._quiet_move()
+        else:
+            self.castling &= ~chess.BB_SQUARES[captured_square]  # a captured rook takes its right with it
+            self._capture(captured_square)
+        self._normalize()
+
+    def _quiet_move(self, retries=3):
+        # draw a move per particle from its distinct board, redraw where it would have captured one of our pieces
+        # and pass if no quiet move was drawn in time
+        boards, index = self._distinct()
+        if len(boards) > self.max_distinct:
+            self.resample(self.max_distinct)
+            boards, index = self._distinct()
+        side = np.full(len(boards), -self.sign, dtype=np.int8)
+        own = boards * side[:, None] > 0
+        own[:, OFF_BOARD] = True
+        moves = requested_moves(boards, own)
+        pending = np.arange(len(self.boards))
+        for attempt in range(retries):
+            rows, from_squares, to_squares = sample_moves(boards, side, self.rng, index[pending], moves)
+            quiet = self.boards[pending[rows], to_squares] * self.sign <= 0
+            play_moves(self.boards, pending[rows[quiet]], from_squares[quiet], to_squares[quiet])
+            pending = pending[rows[~quiet]]  # draws that passed are done as well
+            if len(pending) == 0:
+                break
+
+    def _capture(self, square):
+        # the capturing piece is one of the opponent's pieces attacking the square on the particle's board,
+        # picked uniformly. particles without one keep their pieces and lose weight
+        candidates, from_squares = self.attackers(square, -self.sign)
+        counts = candidates.sum(axis=1)
+        picks = (self.rng.random(len(counts)) * counts).astype(np.int64)
+        rows = np.nonzero(counts)[0]
+        slots = np.argmax(np.cumsum(candidates[rows], axis=1) > picks[rows, None], axis=1)
+        self.boards[counts == 0, square] = 0
+        self.weights[counts == 0] *= self.mismatch
+        play_moves(self.boards, rows, from_squares[rows, slots], np.full(len(rows), square))
+
+    def attackers(self, square, sign):
+        """
+        Pieces of one side that would capture on a square if they moved onto it: the first piece along each ray that
+        moves that way, pawns diagonally behind the square and knights.
+
+        :param square: chess.Square -- the target square
+        :param sign: int -- 1 for white's pieces, -1 for black's
+        :return: Tuple(np.ndarray, np.ndarray) -- (N, 16) bool, one column per ray and knight jump, and the from
+                 square of each column
+        """
+        n = len(self.boards)
+        rows = np.arange(n)
+        rays = RAYS[square]  # (8, 8), the last step is always off the board
+        values = self.boards[:, rays] * sign  # (n, 8, 8), positive for the side's pieces
+        first = np.argmax(values != 0, axis=2)  # 0 for an empty ray, whose piece is then 0 as well
+        piece = values[rows[:, None], np.arange(8), first]
+        piece_types = np.abs(piece)
+        diagonal = np.isin(np.arange(8), DIAGONAL)
+        # a white pawn captures forwards, so it stands south west or south east of the square, a black one north
+        pawn_rays = np.isin(np.arange(8), (3, 5) if sign > 0 else (1, 7))
+        slides = (piece_types == chess.QUEEN) | ((piece_types == chess.BISHOP) & diagonal) | \
+            ((piece_types == chess.ROOK) & ~diagonal)
+        steps = (first == 0) & ((piece_types == chess.KING) | ((piece_types == chess.PAWN) & pawn_rays))
+        ray_attackers = (piece > 0) & (slides | steps)
+        knights = KNIGHT_TARGETS[square]
+        knight_attackers = (self.boards[:, knights] * sign == chess.KNIGHT) & (knights != OFF_BOARD)
+        from_squares = np.concatenate([rays[np.arange(8), first], np.broadcast_to(knights, (n, 8))], axis=1)
+        return np.concatenate([ray_attackers, knight_attackers], axis=1), from_squares
+
+    def sensed(self, sense_result):
+        """
+        Reweights the particles by how many sensed squares they get wrong.
+
+        :param sense_result: List(Tuple(chess.Square, chess.Piece)) -- the sense result, None for empty squares
+        """
+        if not sense_result:
+            return
+        squares = [square for square, piece in sense_result]
+        observed = np.array([0 if piece is None else piece.piece_type if piece.color else -piece.piece_type
+                             for square, piece in sense_result], dtype=np.int8)
+        wrong = (self.boards[:, squares] != observed).sum(axis=1)
+        self.weights *= self.mismatch ** wrong
+        self._normalize()
+
+    def moved(self, requested_move, taken_move, captured_square):
+        """
+        Plays our own move on every particle after reweighting them by whether the referee's answer could have
+        happened on them.
+
+        :param requested_move: chess.Move -- the move we asked for, None if we passed
+        :param taken_move: chess.Move -- the move that was made, None if none was
+        :param captured_square: chess.Square -- where we captured an opponent piece, None if we did not
+        """
+        enemy = self.boards * self.sign < 0
+        wrong = np.zeros(len(self.boards), dtype=np.int64)
+        if taken_move is not None:
+            # the squares we passed were free of opponent pieces and the target held one exactly when we captured
+            passed = list(chess.SquareSet(chess.BB_BETWEEN[taken_move.from_square][taken_move.to_square]))
+            wrong += enemy[:, passed].sum(axis=1)
+            wrong += enemy[:, taken_move.to_square] != (captured_square is not None)
+            if requested_move is not None and taken_move.to_square != requested_move.to_square and \
+                    captured_square is None:
+                # a pawn's double step cut short: an opponent piece stands on the square it stopped before
+                wrong += ~enemy[:, 2 * taken_move.to_square - taken_move.from_square]
+        elif requested_move is not None and self.boards[0, requested_move.from_square] == self.sign * chess.PAWN:
+            # a pawn move that did not happen: a push was blocked by an opponent piece, a diagonal found none
+            if chess.square_file(requested_move.from_square) == chess.square_file(requested_move.to_square):
+                wrong += ~enemy[:, requested_move.from_square + 8 * self.sign]
+            else:
+                wrong += enemy[:, requested_move.to_square]
+        self.weights *= self.mismatch ** wrong
+        if taken_move is not None:
+            self._play_own(taken_move)
+        self._normalize()
+
+    def _play_own(self, move):
+        boards = self.boards
+        piece = boards[0, move.from_square]
+        if move.promotion:
+            piece = self.sign * move.promotion
+        boards[:, move.from_square] = 0
+        boards[:, move.to_square] = piece
+        # moving the king gives up both rights, moving a rook the right on its side
+        self.castling &= 0 if abs(piece) == chess.KING else ~chess.BB_SQUARES[move.from_square]
+        if abs(piece) == chess.KING and abs(move.to_square - move.from_square) == 2:
+            # castling, the rook jumps over the king
+            rank = chess.square_rank(move.from_square)
+            rook_from, rook_to = (chess.square(7, rank), chess.square(5, rank)) if move.to_square > move.from_square \
+                else (chess.square(0, rank), chess.square(3, rank))
+            boards[:, rook_to] = boards[:, rook_from]
+            boards[:, rook_from] = 0
+
+    def _normalize(self):
+        total = self.weights.sum()
+        if total <= 0 or not np.isfinite(total):
+            self.weights[:] = 1.0 / len(self.weights)
+        else:
+            self.weights /= total
+        if self.effective_size < self.resample_fraction * len(self.weights):
+            self.resample()
+
+    def resample(self, ancestors=None):
+        """
+        Systematic resampling: particles are copied in proportion to their weight and the weights reset to uniform.
+
+        :param ancestors: int -- number of particles to copy from, all of them by default
+        """
+        n = len(self.weights)
+        chosen = self._systematic(n if ancestors is None else min(ancestors, n))
+        self.boards = self.boards[chosen[np.arange(n) % len(chosen)]]
+        self.weights = np.full(n, 1.0 / n)
+        self.resamples += 1
+
+    def _systematic(self, count):
+        # count particle indices, each drawn about count * weight times
+        positions = (self.rng.random() + np.arange(count)) / count
+        return np.minimum(np.searchsorted(np.cumsum(self.weights), positions), len(self.weights) - 1)
+
+    def sample(self, count=2048):
+        """
+        Equally likely boards drawn from the particles without changing them, for sense selection where scoring
+        all of them would take too long.
+
+        :param count: int -- number of boards wanted
+        :return: Tuple(np.ndarray, np.ndarray) -- (count, 65) int8 boards and their weights, all particles if there
+                 are no more than count
+        """
+        if count >= len(self.boards):
+            return self.boards, self.weights
+        return self.boards[self._systematic(count)], np.full(count, 1.0 / count)
+
+    def _distinct(self):
+        """
+        :return: Tuple(np.ndarray, np.ndarray) -- the distinct boards and the distinct board of every particle
+        """
+        rows = np.ascontiguousarray(self.boards).view(np.dtype((np.void, self.boards.shape[1])))[:, 0]
+        distinct, first, index = np.unique(rows, return_index=True, return_inverse=True)
+        return self.boards[first], index.reshape(-1)
+
+    def distinct(self):
+        """
+        Deduplicates the particles.
+
+        :return: Tuple(np.ndarray, np.ndarray) -- the distinct boards and their summed weights, most likely first
+        """
+        boards, index = self._distinct()
+        weights = np.bincount(index, weights=self.weights, minlength=len(boards))
+        order = np.argsort(-weights, kind='stable')
+        return boards[order], weights[order]
+
+    def to_board(self, squares):
+        """
+        :param squares: np.ndarray -- one particle
+        :return: chess.Board -- the particle with us to move and our castling rights
+        """
+        board = chess.Board(None)
+        for square in np.nonzero(squares[:64])[0]:
+            code = int(squares[square])
+            board.set_piece_at(int(square), chess.Piece(abs(code), code > 0))
+        board.turn = self.color
+        board.castling_rights = self.castling
+        board.castling_rights = board.clean_castling_rights()
+        return board
+
+    def candidates(self, count):
+        """
+        :param count: int -- number of boards wanted
+        :return: Tuple(List(chess.Board), List(float)) -- the most likely distinct boards and their weights, e.g. for
+                 ISMCTS
+        """
+        boards, weights = self.distinct()
+        return [self.to_board(squares) for squares in boards[:count]], weights[:count].tolist()
+
+    def most_likely(self):
+        """
+        :return: chess.Board -- the distinct board with the largest weight
+        """
+        boards, weights = self.distinct()
+        return self.to_board(boards[0])
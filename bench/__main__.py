@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/__main__.py
+Authors:        Jeremy Webb
+
+Description:    Reproducible benchmark suite for the search and the agent. Every component runs a fixed amount of
+                work (fixed iteration and call counts, no time budgets) on seeded positions, and is timed in
+                microseconds per call as the best of a few repeats. Results are written to a JSON file and compared
+                with a stored baseline; the exit status is 1 if any entry got slower than the tolerance allows.
+Usage:          python -m bench [--output bench_results.json] [--baseline bench/baseline.json] [--tolerance 0.25]
+                                [--scale 1.0] [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import chess
+from game import Game
+from mcts import MCTS
+from my_agent import MyAgent
+
+POSITIONS = {
+    'opening': chess.STARTING_FEN,
+    'middlegame': 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8',
+    'endgame': '8/5k2/8/3p4/8/2N5/5PK1/8 w - - 0 50',
+    'king_hunt': 'r1b2r2/ppq2pk1/2n3p1/3pN1Q1/3P4/2PB4/P4PPP/R4RK1 w - - 0 18',
+}
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def best_time(run, repeats):
+    """
+    :param run: function -- does one round of work and returns (seconds, calls) of the timed part
+    :param repeats: int -- rounds to run
+    :return: float -- fastest microseconds per call over the rounds
+    """
+    best = float('inf')
+    for i in range(repeats):
+        seconds, calls = run()
+        best = min(best, seconds / calls * 1e6)
+    return best
+
+
+def prepared_game(board):
+    """
+    :param board: chess.Board -- true position, the side to move is the player whose turn it is
+    :return: Game -- a game whose truth board is board
+    """
+    game = Game()
+    game.truth_board = board.copy()
+    game.turn = board.turn
+    return game
+
+
+def bench_sim(board, seed, count):
+    search_tree = MCTS(0, board.turn, board, seed=seed)
+
+    def run():
+        search_tree.rng.seed(seed)
+        start = time.perf_counter()
+        for i in range(count):
+            search_tree.sim(board.copy(stack=False), board.turn)
+        return time.perf_counter() - start, count
+    return run
+
+
+def bench_select_expand(board, seed, count):
+    def run():
+        search_tree = MCTS(600, board.turn, board, seed=seed, iterations=count, early_stop=False)
+        search_stats = search_tree.search()
+        phase_times = search_stats.phase_times
+        return phase_times['select'] + phase_times['expand'], search_stats.iterations
+    return run
+
+
+def bench_get_moves(board, seed, count):
+    game = prepared_game(board)
+
+    def run():
+        start = time.perf_counter()
+        for i in range(count):
+            game.get_moves()
+        return time.perf_counter() - start, count
+    return run
+
+
+def bench_handle_move(board, seed, count):
+    def run():
+        rng = random.Random(seed)
+        moves = prepared_game(board).get_moves()
+        games = [(prepared_game(board), rng.choice(moves)) for i in range(count)]
+        start = time.perf_counter()
+        for game, move in games:
+            game.handle_move(move)
+        return time.perf_counter() - start, count
+    return run
+
+
+def bench_sense(board, seed, count, particles):
+    """
+    The opponent makes a seeded move the agent has not seen, then the agent senses around the square it moved to. The
+    agent is started and told about the opponent's move outside the timed part.
+
+    :param particles: int -- particles of the agent's filter, 0 for the single board repair
+    """
+    def run():
+        rng = random.Random(seed)
+        cases = []
+        for i in range(count):
+            truth = board.copy(stack=False)
+            truth.turn = not board.turn
+            move = rng.choice(list(truth.pseudo_legal_moves))
+            captured = truth.color_at(move.to_square) == board.turn
+            truth.push(move)
+            center = chess.square(min(max(chess.square_file(move.to_square), 1), 6),
+                                  min(max(chess.square_rank(move.to_square), 1), 6))
+            sense_result = prepared_game(truth).handle_sense(center)
+            agent = MyAgent(seed=seed + i, particles=particles)
+            agent.handle_game_start(board.turn, board.copy(stack=False))
+            agent.move_number = 1
+            agent.handle_opponent_move_result(captured, move.to_square if captured else None)
+            cases.append((agent, sense_result))
+        start = time.perf_counter()
+        for agent, sense_result in cases:
+            agent.handle_sense_result(sense_result)
+        return time.perf_counter() - start, count
+    return run
+
+
+def bench_sense_belief(board, seed, count):
+    return bench_sense(board, seed, count, MyAgent().particles)
+
+
+def bench_sense_single(board, seed, count):
+    return bench_sense(board, seed, count, 0)
+
+
+# component -> (benchmark, calls per round)
+COMPONENTS = {
+    'sim': (bench_sim, 100),
+    'select_expand': (bench_select_expand, 400),
+    'get_moves': (bench_get_moves, 200),
+    'handle_move': (bench_handle_move, 200),
+    'handle_sense_result': (bench_sense_belief, 20),
+    'handle_sense_result_single': (bench_sense_single, 100),
+}
+
+
+def run_suite(scale=1.0, repeats=5, seed=0):
+    """
+    :param scale: float -- multiplies the number of calls of every component
+    :param repeats: int -- rounds per component, the fastest is kept
+    :param seed: int -- seed of every component
+    :return: dict -- 'component/position' -> microseconds per call
+    """
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for component, (bench, count) in COMPONENTS.items():
+            for name, fen in POSITIONS.items():
+                run = bench(chess.Board(fen), seed, max(1, int(count * scale)))
+                results['{}/{}'.format(component, name)] = best_time(run, repeats)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    :param results: dict -- microseconds per call of this run
+    :param baseline: dict -- microseconds per call of the baseline
+    :param tolerance: float -- allowed slowdown, 0.25 allows 25%
+    :return: List(str) -- the entries that got slower than allowed
+    """
+    regressions = []
+    for key in sorted(results):
+        base = baseline.get(key)
+        ratio = results[key] / base if base else float('nan')
+        slower = base is not None and ratio > 1 + tolerance
+        if slower:
+            regressions.append(key)
+        print('{:32s} {:12.1f} us  baseline {:>12s}  {:>6s}{}'.format(
+            key, results[key], '{:.1f} us'.format(base) if base else '-',
+            '{:.2f}x'.format(ratio) if base else '', '  SLOWER' if slower else ''))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seeded, fixed-work benchmark suite with a baseline comparison.')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--update-baseline', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args()
+
+    results = run_suite(args.scale, args.repeats, args.seed)
+    report = {'python': platform.python_version(), 'chess': chess.__version__, 'seed': args.seed,
+              'scale': args.scale, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('baseline written to', args.baseline)
+    elif regressions:
+        print('{} of {} entries are more than {:.0%} slower than the baseline'.format(
+            len(regressions), len(results), args.tolerance))
+        sys.exit(1)
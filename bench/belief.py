@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/belief.py
+Authors:        Jeremy Webb
+
+Description:    The particle filter (belief.py) against MyAgent's single board repair heuristics on the same referee
+                games. White plays random moves and senses a random inner square; after every sense both trackers
+                are scored by how many of the opponent's pieces their board has on the right square. Also reports
+                the time the filter needs per turn (opponent move, sense and our move result together).
+Usage:          python -m bench.belief [--games 4] [--particles 10000] [--plies 60] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+import chess
+import numpy as np
+from game import Game
+from belief import Belief
+from my_agent import MyAgent
+from tables import INNER_SQUARES
+
+
+
+def opponent_found(board, truth, color):
+    """
+    :return: Tuple(int, int) -- opponent pieces of truth that board has on the same square, and how many there are
+    """
+    pieces = truth.occupied_co[not color]
+    found = 0
+    for square in chess.scan_reversed(pieces):
+        found += board.piece_at(square) == truth.piece_at(square)
+    return found, chess.popcount(pieces)
+
+
+def play(seed, particles, plies):
+    """
+    :return: Tuple(List, List, List) -- (found, total) after every sense of the filter and of the heuristics, and the
+             seconds the filter spent per turn
+    """
+    rng = random.Random(seed)
+    game = Game()
+    belief = Belief(chess.Board(), chess.WHITE, particles, seed=seed)
+    agent = MyAgent(seed=seed, particles=0)
+    agent.handle_game_start(chess.WHITE, chess.Board())
+    filter_scores, heuristic_scores, turn_times = [], [], []
+    for ply in range(plies):
+        if game.is_over():
+            break
+        if game.turn == chess.BLACK:
+            game.handle_move(rng.choice(game.get_moves()) if rng.random() < 0.95 else None)
+            game.turn = not game.turn
+            continue
+        captured_square = game.opponent_move_result() if ply > 0 else None
+        sense_result = game.handle_sense(rng.choice(INNER_SQUARES))
+        truth = game.truth_board.copy(stack=False)
+        requested_move, taken_move, captured_square_ours, reason = game.handle_move(rng.choice(game.get_moves()))
+
+        start = time.perf_counter()
+        if ply > 0:
+            belief.opponent_moved(captured_square)
+        belief.sensed(sense_result)
+        sensed_board = belief.most_likely()
+        belief.moved(requested_move, taken_move, captured_square_ours)
+        turn_times.append(time.perf_counter() - start)
+        filter_scores.append(opponent_found(sensed_board, truth, chess.WHITE))
+
+        if ply > 0:
+            agent.handle_opponent_move_result(captured_square is not None, captured_square)
+        agent.handle_sense_result(sense_result)
+        heuristic_scores.append(opponent_found(agent.current_board, truth, chess.WHITE))
+        agent.handle_move_result(requested_move, taken_move, reason, captured_square_ours is not None,
+                                 captured_square_ours)
+        game.turn = not game.turn
+    return filter_scores, heuristic_scores, turn_times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Particle filter against the repair heuristics.')
+    parser.add_argument('--games', type=int, default=4)
+    parser.add_argument('--particles', type=int, default=10000)
+    parser.add_argument('--plies', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    found = {'filter': [0, 0], 'heuristics': [0, 0]}
+    times = []
+    for i in range(args.games):
+        filter_scores, heuristic_scores, turn_times = play(args.seed + i, args.particles, args.plies)
+        for name, scores in (('filter', filter_scores), ('heuristics', heuristic_scores)):
+            found[name][0] += sum(f for f, t in scores)
+            found[name][1] += sum(t for f, t in scores)
+        times.extend(turn_times)
+        print('game {}: {} turns, filter {}/{} heuristics {}/{} opponent pieces on the right square'.format(
+            i, len(turn_times), sum(f for f, t in filter_scores), sum(t for f, t in filter_scores),
+            sum(f for f, t in heuristic_scores), sum(t for f, t in heuristic_scores)))
+    for name, (hits, total) in found.items():
+        print('{:10s} {:.3f} of the opponent pieces on the right square'.format(name, hits / max(total, 1)))
+    times = np.array(times) * 1e3
+    print('filter with {} particles: {:.1f} ms per turn on average, {:.1f} ms at most'.format(
+        args.particles, times.mean(), times.max()))
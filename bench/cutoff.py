@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/cutoff.py
+Authors:        Jeremy Webb
+
+Description:    Effect of the rollout depth cutoff (followed by the static evaluation) on MCTS iterations per second
+                and on results against the Random agent over a fixed batch of seeded games.
+Usage:          python -m bench.cutoff [--depths 150 40 20 10] [--games 4] [--iterations 100]
+"""
+
+import argparse
+import time
+import chess
+from mcts import MCTS
+from my_agent import MyAgent
+from random_agent import Random
+from bench.games import play_headless
+
+MIDDLEGAME = 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8'
+
+
+def iterations_per_second(board, depth, iterations, seed=0):
+    search_tree = MCTS(600, board.turn, board, seed=seed, iterations=iterations, rollout_depth=depth,
+                       early_stop=False)
+    start = time.perf_counter()
+    search_tree.search()
+    return iterations / (time.perf_counter() - start)
+
+
+def score_against_random(depth, games, iterations):
+    """
+    :return: float -- points scored by MyAgent (1 per win, 0.5 per draw), colours alternating over seeds 0..games-1
+    """
+    points = 0
+    for seed in range(games):
+        agent = MyAgent(search_options={'iterations': iterations, 'rollout_depth': depth, 'seed': seed})
+        color = chess.WHITE if seed % 2 == 0 else chess.BLACK
+        players = (agent, Random()) if color == chess.WHITE else (Random(), agent)
+        winner = play_headless(players[0], players[1], seed)
+        points += 0.5 if winner is None else float(winner == color)
+    return points
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rollout depth cutoff benchmark.')
+    parser.add_argument('--depths', type=int, nargs='+', default=[150, 40, 20, 10])
+    parser.add_argument('--games', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    for depth in args.depths:
+        opening = iterations_per_second(chess.Board(), depth, 300)
+        middlegame = iterations_per_second(chess.Board(MIDDLEGAME), depth, 300)
+        points = score_against_random(depth, args.games, args.iterations) if args.games else float('nan')
+        print('depth {:4d}  {:8.1f} it/s opening  {:8.1f} it/s middlegame  {:4.1f}/{} vs Random'.format(
+            depth, opening, middlegame, points, args.games))
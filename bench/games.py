@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/games.py
+Authors:        Jeremy Webb
+
+Description:    Plays seeded games between two agents without writing game history files or printing boards. Used by
+                the benchmarks that measure playing strength.
+"""
+
+import contextlib
+import io
+import random
+import chess
+from game import Game
+from play_game import play_turn
+
+
+def play_headless(white_player, black_player, seed, max_turns=200):
+    """
+    :param white_player: Player -- agent playing white
+    :param black_player: Player -- agent playing black
+    :param seed: int -- seed for the global random module (the Random agent and the referee's helpers use it)
+    :param max_turns: int -- turns after which the game counts as a draw
+    :return: chess.WHITE/chess.BLACK/None -- the winner, None for a draw
+    """
+    random.seed(seed)
+    players = [black_player, white_player]
+    game = Game()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        white_player.handle_game_start(chess.WHITE, chess.Board())
+        black_player.handle_game_start(chess.BLACK, chess.Board())
+        game.start()
+        turn = 0
+        while not game.is_over() and turn < max_turns:
+            play_turn(game, players[game.turn], game.turn, turn, log, log)
+            turn += 1
+        if not game.is_over():
+            return None
+        winner_color, winner_reason = game.get_winner()
+        white_player.handle_game_end(winner_color, winner_reason)
+        black_player.handle_game_end(winner_color, winner_reason)
+    return winner_color
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/history.py
+Authors:        Jeremy Webb
+
+Description:    The history table (history.py) over a sequence of positions from one game, searched in order like
+                MyAgent does. Each position gets a fixed iteration search without priors and one with the table
+                carried over from the earlier positions, and both are compared with a longer reference search: how
+                often the best move matches and what share of the root visits goes to the reference move. Also
+                times rollouts with the table's rejection sampling against unbiased ones.
+Usage:          python -m bench.history [--positions 8] [--iterations 1500] [--reference 6000] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+import chess
+from game import Game
+from mcts import MCTS
+from history import HistoryTable
+from rollout import RolloutBoard, rollout
+from tree import encode_move
+
+
+def game_positions(count, seed, plies_between=2):
+    """
+    :return: List(chess.Board) -- white to move positions of a random referee game, plies_between plies apart
+    """
+    rng = random.Random(seed)
+    game = Game()
+    positions = []
+    while len(positions) < count and not game.is_over():
+        if game.turn == chess.WHITE and len(game.truth_board.move_stack) % (2 * plies_between) == 0:
+            positions.append(game.truth_board.copy(stack=False))
+        moves = game.get_moves()
+        game.handle_move(rng.choice(moves))
+        game.turn = not game.turn
+    return positions
+
+
+def visit_share(search_tree, move):
+    stats = search_tree.root_stats()
+    total = sum(visits for visits, wins in stats.values())
+    return stats.get(encode_move(move), [0, 0.0])[0] / max(total, 1)
+
+
+def rollout_speed(board, keep, count, seed):
+    """
+    :return: float -- microseconds per rollout ply
+    """
+    rng = random.Random(seed)
+    plies = 0
+    start = time.perf_counter()
+    for i in range(count):
+        plies += rollout(RolloutBoard.from_board(board), board.turn, 40, rng, True, keep)[1]
+    return (time.perf_counter() - start) / max(plies, 1) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='History priors carried across searches against uniform priors.')
+    parser.add_argument('--positions', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=1500)
+    parser.add_argument('--reference', type=int, default=6000, help='iterations of the reference search')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    history = HistoryTable()
+    totals = {'uniform': [0, 0.0, 0.0], 'history': [0, 0.0, 0.0]}  # matches, visit share, seconds
+    for i, board in enumerate(game_positions(args.positions, args.seed)):
+        reference = MCTS(600, board.turn, board, seed=args.seed + 1000, iterations=args.reference,
+                         early_stop=False).search().best_move
+        line = []
+        for name, table in (('uniform', None), ('history', history)):
+            search_tree = MCTS(600, board.turn, board, seed=args.seed + i, iterations=args.iterations,
+                               early_stop=False, history=table)
+            search_stats = search_tree.search()
+            total = totals[name]
+            total[0] += search_stats.best_move == reference
+            total[1] += visit_share(search_tree, reference)
+            total[2] += search_stats.elapsed
+            line.append('{} {} {:.2f}'.format(name, search_stats.best_move, visit_share(search_tree, reference)))
+            if table is not None:
+                keep = history.acceptance()
+                history.update(board, search_tree.tree)
+        print('position {:2d} reference {}  {}'.format(i, reference, '  '.join(line)))
+
+    count = max(args.positions, 1)
+    for name, (matches, share, seconds) in totals.items():
+        print('{:8s} best move = reference {:2d}/{}  mean reference visit share {:.3f}  {:6.1f} it/s'.format(
+            name, matches, count, share / count, count * args.iterations / seconds))
+    board = chess.Board('r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8')
+    print('rollout ply: uniform {:.2f} us  history {:.2f} us'.format(
+        rollout_speed(board, None, 1000, args.seed), rollout_speed(board, keep, 1000, args.seed)))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/ismcts.py
+Authors:        Jeremy Webb
+
+Description:    One ISMCTS search over K candidate boards against K independent MCTS searches, one per candidate,
+                with the same total iteration budget. The candidates are a known position after K different hidden
+                opponent replies. Reports wall time, iterations per second and the moves each approach settles on.
+Usage:          python -m bench.ismcts [--candidates 8] [--iterations 4000] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+import chess
+from mcts import MCTS, ISMCTS
+from tree import decode_move
+
+# black is to move, we play white and do not see the reply
+MIDDLEGAME = 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R b KQ - 0 8'
+
+
+def candidate_boards(fen, count, seed):
+    """
+    :return: List(chess.Board) -- the position after count different random replies of the side to move
+    """
+    board = chess.Board(fen)
+    replies = list(board.pseudo_legal_moves)
+    random.Random(seed).shuffle(replies)
+    boards = []
+    for reply in replies[:count]:
+        candidate = board.copy(stack=False)
+        candidate.push(reply)
+        boards.append(candidate)
+    return boards
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ISMCTS over K candidates vs K independent MCTS searches.')
+    parser.add_argument('--candidates', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=4000, help='total budget of either approach')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    boards = candidate_boards(MIDDLEGAME, args.candidates, args.seed)
+    team = boards[0].turn
+
+    start = time.perf_counter()
+    ismcts = ISMCTS(600, team, boards, seed=args.seed, iterations=args.iterations, early_stop=False)
+    search_stats = ismcts.search()
+    ismcts_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    picks, merged = Counter(), Counter()
+    per_board = args.iterations // len(boards)
+    for i, board in enumerate(boards):
+        search_tree = MCTS(600, team, board, seed=args.seed + i, iterations=per_board, early_stop=False)
+        picks[search_tree.search().best_move.uci()] += 1
+        for code, (visits, wins) in search_tree.root_stats().items():
+            merged[code] += visits
+    separate_time = time.perf_counter() - start
+    separate_iterations = per_board * len(boards)
+
+    print('{} candidates, {} iterations in total'.format(len(boards), args.iterations))
+    print('ISMCTS         {:6.2f}s {:8.1f} it/s  {:6d} nodes  move {}'.format(
+        ismcts_time, args.iterations / ismcts_time, search_stats.nodes, search_stats.best_move))
+    print('{:2d} x MCTS      {:6.2f}s {:8.1f} it/s  {:6d} iterations each  moves {}  most visits overall {}'.format(
+        len(boards), separate_time, separate_iterations / separate_time, per_board, dict(picks),
+        decode_move(max(merged, key=merged.get))))
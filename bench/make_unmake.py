@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/make_unmake.py
+Authors:        Jeremy Webb
+
+Description:    Compares the make/unmake search (one board copy per iteration, push only) with the old copying mode
+                (a board stored in every node and a copy on every rollout ply). Each mode runs a fixed number of
+                iterations in a fresh process so the peak RSS numbers do not mix.
+Usage:          python -m bench.make_unmake [--iterations 2000] [--seed 0]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+import chess
+from copy import copy
+from mcts import MCTS, captured_king
+
+
+class CopyingMCTS(MCTS):
+    """
+    The search as it was before make/unmake: every node keeps its own board and rollouts copy the board each ply.
+    """
+
+    def reset(self):
+        super().reset()
+        self.states = {0: self.board_state}
+
+    def iterate(self):
+        board = copy(self.states[0])
+        selected = self.sel(0, board)
+        board = copy(self.states[selected])
+        new_node = self.expand(selected, board)
+        if new_node != selected:
+            self.states[new_node] = copy(board)
+        result = self.sim(board, self.team)
+        self.backprop(new_node, result)
+
+    def sim(self, board, team, n=150):
+        curr_state = board
+        for i in range(n):
+            board_copy = copy(curr_state)
+            loser = captured_king(board_copy)
+            if loser is not None:
+                return 1 if loser != team else 0
+            possible_moves = list(board_copy.pseudo_legal_moves)
+            possible_moves.append(chess.Move.null())
+            board_copy.push(self.rng.choice(possible_moves))
+            curr_state = board_copy
+        return .5
+
+
+def run_mode(mode, iterations, seed):
+    """
+    :return: Tuple(float, int, int) -- iterations per second, tree size and peak RSS in kB of this process
+    """
+    cls = CopyingMCTS if mode == 'copy' else MCTS
+    # both modes roll out 150 plies without the king capture shortcut, so only the board handling differs
+    search_tree = cls(0, chess.WHITE, chess.Board(), seed=seed, rollout_depth=150, tactics=False)
+    search_tree.reset()
+    start = time.perf_counter()
+    for i in range(iterations):
+        search_tree.iterate()
+    rate = iterations / (time.perf_counter() - start)
+    return rate, search_tree.tree.size, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Copying vs make/unmake rollouts: rollouts/sec and peak RSS.')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    for mode in ['copy', 'make/unmake']:
+        with ctx.Pool(1) as pool:
+            rate, size, rss = pool.apply(run_mode, (mode, args.iterations, args.seed))
+        print('{:12s} {:8.1f} rollouts/s  {:6d} nodes  peak RSS {:7.1f} MB'.format(mode, rate, size, rss / 1024))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/memory_budget.py
+Authors:        Jeremy Webb
+
+Description:    Runs searches of growing length with and without a node budget. Without one the tree grows with the
+                search time; with one the least visited subtrees are pruned and their slots reused, so tree capacity
+                and peak RSS stay flat. Every search runs in a fresh process so the peak RSS numbers do not mix.
+Usage:          python -m bench.memory_budget [--times 2 4 8] [--max-nodes 20000] [--seed 0]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import chess
+from mcts import MCTS
+
+
+def run_search(seconds, max_nodes, seed):
+    """
+    :return: Tuple(int, int, int, int, int) -- iterations, nodes in use, tree capacity, prunes and peak RSS in kB
+    """
+    search_tree = MCTS(seconds, chess.WHITE, chess.Board(), seed=seed, early_stop=False, max_nodes=max_nodes)
+    search_tree.search()
+    stats = search_tree.stats()
+    return (int(search_tree.tree.visits[0]), stats['nodes'], search_tree.tree.capacity, stats['prunes'],
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tree size and peak RSS of long searches with a node budget.')
+    parser.add_argument('--times', type=float, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--max-nodes', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    for budget in [None, args.max_nodes]:
+        for seconds in args.times:
+            with ctx.Pool(1) as pool:
+                iterations, nodes, capacity, prunes, rss = pool.apply(run_search, (seconds, budget, args.seed))
+            print('budget {:>6s} {:5.1f}s {:7d} iterations {:7d} nodes {:7d} capacity {:4d} prunes  '
+                  'peak RSS {:7.1f} MB'.format(str(budget), seconds, iterations, nodes, capacity, prunes, rss / 1024))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/rollout_engine.py
+Authors:        Jeremy Webb
+
+Description:    Checks the rollout board (rollout.py) against the referee and times it. Random games are played with
+                Game; in every position the moves RolloutBoard generates must equal Game.get_moves, and every one of
+                them, pushed on a RolloutBoard, must give the same position, castling rights and en passant square
+                as Game.handle_move, and the moves RolloutBoard.random_move draws must be among them. Then rollouts per
+                second of MCTS.sim are compared with the python-chess rollout it replaced, the best of a few
+                alternating repeats each.
+Usage:          python -m bench.rollout_engine [--games 10] [--rollouts 300] [--repeats 3] [--seed 0]
+"""
+
+import argparse
+import random
+import sys
+import time
+import chess
+from game import Game
+from mcts import MCTS, captured_king
+from evaluation import evaluate
+from rollout import RolloutBoard
+from tree import encode_move, decode_move
+
+FENS = [chess.STARTING_FEN, 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8',
+        '8/5k2/8/3p4/8/2N5/5PK1/8 w - - 0 50']
+
+
+def chess_sim(board, team, rng, n=40):
+    """
+    The rollout as it was before the rollout board: python-chess pseudo-legal moves and pushes.
+    """
+    for i in range(n):
+        loser = captured_king(board)
+        if loser is not None:
+            return 1 if loser != team else 0
+        possible_moves = list(board.pseudo_legal_moves)
+        possible_moves.append(chess.Move.null())
+        board.push(rng.choice(possible_moves))
+    loser = captured_king(board)
+    if loser is not None:
+        return 1 if loser != team else 0
+    return evaluate(board, team)
+
+
+def referee_at(board):
+    game = Game()
+    game.truth_board = board.copy()
+    game.turn = board.turn
+    return game
+
+
+def check_position(truth):
+    """
+    :param truth: chess.Board -- position with the player to move
+    :return: List(str) -- descriptions of every difference to the referee
+    """
+    errors = []
+    rollout_board = RolloutBoard.from_board(truth)
+    generated = rollout_board.moves()
+    expected = {encode_move(move) for move in referee_at(truth).get_moves()}
+    if len(set(generated)) != len(generated) or set(generated) != expected:
+        errors.append('{}: generated {}'.format(truth.fen(), sorted(
+            decode_move(code).uci() for code in set(generated) ^ expected)))
+    rng = random.Random(0)
+    drawn = {rollout_board.random_move(rng) for i in range(20)} - {0}
+    if drawn - expected:
+        errors.append('{}: drew {}'.format(truth.fen(), sorted(decode_move(code).uci() for code in drawn - expected)))
+    evaluation = evaluate(truth, chess.WHITE)
+    if abs(evaluate(rollout_board.to_board(), chess.WHITE) - evaluation) > 1e-12:
+        errors.append('{}: evaluation'.format(truth.fen()))
+    for code in expected:
+        game = referee_at(truth)
+        game.handle_move(decode_move(code))
+        pushed = rollout_board.copy()
+        pushed.push(code)
+        board = pushed.to_board()
+        referee = game.truth_board
+        if (board.board_fen(), board.turn, board.ep_square, board.castling_rights) != \
+                (referee.board_fen(), referee.turn, referee.ep_square, referee.castling_rights):
+            errors.append('{}: {} gives {} instead of {}'.format(
+                truth.fen(), decode_move(code), board.fen(), referee.fen()))
+    return errors
+
+
+def check_parity(games, seed, max_plies=150):
+    """
+    :return: Tuple(int, int, List(str)) -- positions checked, moves pushed and the differences found
+    """
+    positions = pushed = 0
+    errors = []
+    for i in range(games):
+        rng = random.Random(seed + i)
+        game = Game()
+        for ply in range(max_plies):
+            if game.is_over():
+                break
+            errors.extend(check_position(game.truth_board))
+            moves = game.get_moves()
+            positions += 1
+            pushed += len(set(moves))
+            game.handle_move(rng.choice(moves) if rng.random() < 0.95 else None)
+            game.turn = not game.turn
+    return positions, pushed, errors
+
+
+def rollouts_per_second(sim, fen, rollouts, seed):
+    board = chess.Board(fen)
+    start = time.perf_counter()
+    for i in range(rollouts):
+        sim(board.copy(stack=False), board.turn, random.Random(seed + i))
+    return rollouts / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rollout board parity with the referee and rollouts/sec.')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--rollouts', type=int, default=300)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    positions, pushed, errors = check_parity(args.games, args.seed)
+    for error in errors[:20]:
+        print(error)
+    print('parity: {} positions, {} moves pushed, {} differences'.format(positions, pushed, len(errors)))
+
+    search_tree = MCTS(0, chess.WHITE)
+
+    def engine_sim(board, team, rng):
+        search_tree.rng = rng
+        return search_tree.sim(board, team)
+
+    for fen in FENS:
+        before = after = 0
+        for i in range(args.repeats):
+            before = max(before, rollouts_per_second(chess_sim, fen, args.rollouts, args.seed))
+            after = max(after, rollouts_per_second(engine_sim, fen, args.rollouts, args.seed))
+        print('{:70s} python-chess {:8.1f}/s  rollout board {:8.1f}/s  ({:.1f}x)'.format(
+            fen, before, after, after / before))
+    if errors:
+        sys.exit(1)
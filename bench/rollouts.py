@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/rollouts.py
+Authors:        Jeremy Webb
+
+Description:    Rollouts per second of MCTS.sim against the original FEN-based rollout loop, on fixed seeds.
+Usage:          python -m bench.rollouts [--rollouts 200] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+import chess
+from copy import copy
+from mcts import MCTS
+
+
+def legacy_sim(board, team, n=150):
+    """
+    The rollout loop as it was before the bitboard terminal check, kept as the reference point.
+    """
+    curr_state = board
+    i = 0
+    while i < n:
+        board_copy = copy(curr_state)
+        if board_copy.fen().split()[0].lower().count('k') < 2:
+            winner = chess.WHITE if board.copy().fen().split()[0].count('k') == 0 else chess.BLACK
+            if winner == team:
+                return 1
+            else:
+                return 0
+        else:
+            possible_moves = list(board_copy.pseudo_legal_moves)
+            possible_moves.append(chess.Move.null())
+            next_move = random.choice(possible_moves)
+            board_copy.push(next_move)
+            curr_state = board_copy
+        i = i + 1
+    return .5
+
+
+def rollouts_per_second(sim, rollouts, seed, board=None, rng=random):
+    """
+    :param sim: function(board, team) -- rollout function to time
+    :param rollouts: int -- number of rollouts to play
+    :param seed: int -- seed of the first rollout, rollout i uses seed + i
+    :param board: chess.Board -- start position, defaults to the initial position
+    :param rng: random.Random -- generator used by sim, reseeded before every rollout
+    :return: float -- rollouts per second
+    """
+    board = board or chess.Board()
+    start = time.perf_counter()
+    for i in range(rollouts):
+        rng.seed(seed + i)
+        sim(board.copy(), chess.WHITE)
+    return rollouts / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rollouts/sec before and after the bitboard terminal check.')
+    parser.add_argument('--rollouts', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    before = rollouts_per_second(legacy_sim, args.rollouts, args.seed)
+    # the same 150 plies as the legacy loop and no king capture shortcut, so only the terminal check differs
+    search_tree = MCTS(0, chess.WHITE, rollout_depth=150, tactics=False)
+    after = rollouts_per_second(search_tree.sim, args.rollouts, args.seed, rng=search_tree.rng)
+    print('legacy sim: {:8.1f} rollouts/s'.format(before))
+    print('MCTS.sim:   {:8.1f} rollouts/s  ({:.2f}x)'.format(after, after / before))
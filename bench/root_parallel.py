@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/root_parallel.py
+Authors:        Jeremy Webb
+
+Description:    Scaling of the root-parallel MCTS from 1 to N worker processes for the same wall-clock budget, plus a
+                determinism check of seeded, iteration-bounded searches.
+Usage:          python -m bench.root_parallel [--max-workers 4] [--seconds 2]
+"""
+
+import argparse
+import os
+import time
+import chess
+from mcts import MCTS
+
+
+def root_visits(search_tree):
+    return sum(visits for visits, wins in search_tree.root_stats().values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Root-parallel MCTS scaling benchmark.')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seconds', type=float, default=2)
+    args = parser.parse_args()
+
+    base = None
+    for workers in range(1, args.max_workers + 1):
+        MCTS(0.1, chess.WHITE, chess.Board(), workers=workers).search()  # start the pool so start up is not timed
+        search_tree = MCTS(args.seconds, chess.WHITE, chess.Board(), workers=workers, seed=0, early_stop=False)
+        start = time.time()
+        search_tree.search()
+        elapsed = time.time() - start
+        visits = root_visits(search_tree)
+        base = base or visits
+        print('{:3d} workers  {:8d} root visits  {:8.1f} it/s  {:5.2f}x'.format(workers, visits, visits / elapsed,
+                                                                              visits / base))
+
+    runs = []
+    for i in range(2):
+        search_tree = MCTS(60, chess.WHITE, chess.Board(), workers=min(2, args.max_workers), seed=7, iterations=50)
+        search_tree.search()
+        runs.append((search_tree.root_stats(), search_tree.pick_move()))
+    print('seeded searches deterministic: {}'.format(runs[0] == runs[1]))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/selection.py
+Authors:        Jeremy Webb
+
+Description:    Measures MCTS iterations per second over the course of a search from the starting position. With
+                the root-to-leaf UCT descent the rate should stay flat instead of falling as the tree grows.
+Usage:          python -m bench.selection [--seconds 5] [--window 0.5]
+"""
+
+import argparse
+import time
+import chess
+from mcts import MCTS
+
+
+def iteration_rates(seconds, window):
+    """
+    Runs a search for `seconds` and counts iterations in consecutive windows.
+
+    :param seconds: float -- total search time
+    :param window: float -- length of one measurement window
+    :return: List(Tuple(float, float, int)) -- (window start, iterations/sec, tree size) for every window
+    """
+    search_tree = MCTS(seconds, chess.WHITE, chess.Board())
+    search_tree.reset()
+
+    rates = []
+    start = time.time()
+    window_start, count = start, 0
+    while time.time() - start < seconds:
+        search_tree.iterate()
+        count += 1
+        now = time.time()
+        if now - window_start >= window:
+            rates.append((window_start - start, count / (now - window_start), search_tree.tree.size))
+            window_start, count = now, 0
+    return rates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Iterations/sec across a single MCTS search.')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--window', type=float, default=0.5)
+    args = parser.parse_args()
+
+    for t, rate, size in iteration_rates(args.seconds, args.window):
+        print('{:5.1f}s  {:8.1f} it/s  {:6d} nodes'.format(t, rate, size))
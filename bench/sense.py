@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/sense.py
+Authors:        Jeremy Webb
+Description:    Sense selection by window entropy (sense.py) against a random inner square, both feeding the
+                particle filter on the same referee games. After every sense the filter's most likely board is scored
+                by how many of the opponent's pieces it has on the right square. Also times the selection on the
+                drawn particles and on all of them.
+Usage:          python -m bench.sense [--games 4] [--particles 10000] [--samples 2048] [--plies 60] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+import chess
+import numpy as np
+from game import Game
+from belief import Belief
+from sense import choose_sense
+from tables import INNER_SQUARES
+from bench.belief import opponent_found
+
+
+def play(seed, particles, samples, plies, selection):
+    """
+    :return: Tuple(List, List, List) -- (found, total) after every sense, and the seconds sense selection took on the
+             drawn particles and on all of them
+    """
+    rng = random.Random(seed)  # the game's moves, the same for both selections
+    sense_rng = random.Random(seed + 1)
+    game = Game()
+    belief = Belief(chess.Board(), chess.WHITE, particles, seed=seed)
+    scores, sample_times, full_times = [], [], []
+    for ply in range(plies):
+        if game.is_over():
+            break
+        if game.turn == chess.BLACK:
+            game.handle_move(rng.choice(game.get_moves()) if rng.random() < 0.95 else None)
+            game.turn = not game.turn
+            continue
+        captured_square = game.opponent_move_result() if ply > 0 else None
+        if ply > 0:
+            belief.opponent_moved(captured_square)
+        own = game.truth_board.occupied_co[chess.WHITE]
+        start = time.perf_counter()
+        boards, weights = belief.sample(samples)
+        sense = choose_sense(boards, weights, own, sense_rng)[0]
+        sample_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        choose_sense(belief.boards, belief.weights, own, random.Random(0))
+        full_times.append(time.perf_counter() - start)
+        if selection == 'random':
+            sense = sense_rng.choice(INNER_SQUARES)
+        belief.sensed(game.handle_sense(sense))
+        scores.append(opponent_found(belief.most_likely(), game.truth_board, chess.WHITE))
+        requested_move, taken_move, captured_square, reason = game.handle_move(rng.choice(game.get_moves()))
+        belief.moved(requested_move, taken_move, captured_square)
+        game.turn = not game.turn
+    return scores, sample_times, full_times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Entropy sense selection against random senses.')
+    parser.add_argument('--games', type=int, default=4)
+    parser.add_argument('--particles', type=int, default=10000)
+    parser.add_argument('--samples', type=int, default=2048, help='particles drawn to score the sense squares on')
+    parser.add_argument('--plies', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sample_times, full_times = [], []
+    for selection in ('random', 'entropy'):
+        hits, total = 0, 0
+        for i in range(args.games):
+            scores, sampled, full = play(args.seed + i, args.particles, args.samples, args.plies, selection)
+            hits += sum(f for f, t in scores)
+            total += sum(t for f, t in scores)
+            sample_times.extend(sampled)
+            full_times.extend(full)
+        print('{:8s} {:.3f} of the opponent pieces on the right square after sensing'.format(
+            selection, hits / max(total, 1)))
+    for name, times in (('{} drawn particles'.format(args.samples), sample_times),
+                        ('all {} particles'.format(args.particles), full_times)):
+        times = np.array(times) * 1e3
+        print('selection on {}: {:.1f} ms on average, {:.1f} ms at most'.format(name, times.mean(), times.max()))
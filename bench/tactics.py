@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/tactics.py
+Authors:        Jeremy Webb
+
+Description:    What the tactical pre-pass (tactics.py) buys. For a capturable enemy king, an attacked king with one
+                or a few ways out and a quiet middlegame it times the pre-pass and shows what MyAgent plays. Then it
+                runs the same fixed iteration search with tactics off and on (on also restricts the root to the
+                saving moves like MyAgent does) and prints the most visited root moves with their values. With tactics
+                a hanging king is recognised on the first visit instead of whenever a random rollout happens to take
+                it.
+Usage:          python -m bench.tactics [--iterations 2000] [--seed 0]
+"""
+
+import argparse
+import time
+import chess
+from mcts import MCTS
+from tactics import forced_move
+from tree import decode_move
+
+POSITIONS = [
+    ('king capture', 'rnbqkbnr/ppp2ppp/8/1B1pp3/4P3/8/PPPP1PPP/RNBQK1NR w KQkq - 0 3'),
+    ('only escape', '1nb1kbnr/rp1ppppp/p1p5/8/1P6/5P1P/P1PPPqP1/RNBQKBNR w KQk - 1 7'),
+    ('few escapes', 'rnb1kbnr/1p2pp1p/p1p5/3p2p1/1P6/B1N2N2/P1PqPPPP/1R1QKB1R w Kkq - 0 14'),
+    ('quiet', 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8'),
+]
+
+
+def top_moves(search_tree, count=3):
+    """
+    :return: str -- the most visited root moves as uci visits/value
+    """
+    stats = sorted(search_tree.root_stats().items(), key=lambda item: -item[1][0])[:count]
+    return ', '.join('{} {}/{:.2f}'.format(decode_move(code).uci(), visits, wins / max(visits, 1))
+                     for code, (visits, wins) in stats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tactical pre-pass timings and search values with/without tactics.')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for name, fen in POSITIONS:
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        move, tactic, safe = forced_move(board)
+        pre_pass = time.perf_counter() - start
+        print('{}: {}'.format(name, fen))
+        print('  pre-pass {:8.1f} us  plays {}  ({})  saving moves {}'.format(
+            pre_pass * 1e6, move, tactic, None if safe is None else [m.uci() for m in safe]))
+        for tactics in (False, True):
+            options = {'moves': safe} if tactics and safe else {}
+            search_tree = MCTS(600, board.turn, board, seed=args.seed, iterations=args.iterations, early_stop=False,
+                               tactics=tactics, **options)
+            search_stats = search_tree.search()
+            print('  tactics {:5s} {:6.2f}s  best {}  {}'.format(
+                str(tactics), search_stats.elapsed, search_stats.best_move, top_moves(search_tree)))
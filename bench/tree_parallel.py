@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/tree_parallel.py
+Authors:        Jeremy Webb
+
+Description:    Throughput of the tree-parallel MCTS (virtual loss, batched rollouts in a process pool) against the
+                single-process search, and a consistency check that the shared tree's visit counts add up.
+Usage:          python -m bench.tree_parallel [--workers 4] [--seconds 3]
+"""
+
+import argparse
+import os
+import chess
+from mcts import MCTS
+
+
+def check_visits(search_tree, iterations=None):
+    """
+    Every node is simulated once when it is created (terminal nodes again whenever they are selected), so its visits
+    must equal the sum of its children's visits plus its own simulations and no virtual loss may be left behind.
+
+    :param search_tree: MCTS -- a finished search
+    :param iterations: int -- expected number of root visits, if known
+    :return: bool -- True if all counts add up
+    """
+    tree = search_tree.tree
+    if iterations is not None and tree.visits[0] != iterations:
+        return False
+    for node in range(tree.size):
+        own = tree.visits[node] - sum(tree.visits[c] for c in tree.children(node))
+        terminal = tree.num_moves[node] == 0
+        if own < 0 or (not terminal and own > (0 if node == 0 else 1)):
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tree-parallel vs single process MCTS.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    single = MCTS(args.seconds, chess.WHITE, chess.Board(), seed=0, early_stop=False)
+    single.search()
+    print('single process  {:8.1f} it/s  {:6d} nodes'.format(single.tree.visits[0] / args.seconds, single.tree.size))
+
+    warm_up = MCTS(0.5, chess.WHITE, chess.Board(), workers=max(2, args.workers), parallel='tree')
+    warm_up.search()  # start the pool so start up is not timed
+    shared = MCTS(args.seconds, chess.WHITE, chess.Board(), workers=max(2, args.workers), seed=0, parallel='tree',
+                  early_stop=False)
+    shared.search()
+    print('tree parallel   {:8.1f} it/s  {:6d} nodes  ({} workers)'.format(
+        shared.tree.visits[0] / args.seconds, shared.tree.size, shared.workers))
+
+    bounded = MCTS(60, chess.WHITE, chess.Board(), workers=max(2, args.workers), seed=0, parallel='tree',
+                   iterations=301, early_stop=False)
+    bounded.search()
+    print('visit counts add up: {}'.format(check_visits(shared) and check_visits(bounded, 301)))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      bench/uct.py
+Authors:        Jeremy Webb
+
+Description:    Cost of picking a child at one node: the vectorized UCT over the node's contiguous child block against
+                scoring children one at a time with NumPy scalar functions, at 20, 40 and 80 children.
+Usage:          python -m bench.uct [--repeats 20000]
+"""
+
+import argparse
+import random
+import timeit
+import chess
+import numpy as np
+from mcts import MCTS
+from tree import Tree
+
+
+def scalar_select(tree, node):
+    """
+    Per child scoring as MCTS.UCT used to do it, kept as the reference point.
+    """
+    best, best_score = -1, -1
+    for child in tree.children(node):
+        score = tree.wins[child] / tree.visits[child] + \
+            np.sqrt(2) * np.sqrt(np.log(tree.visits[node]) / tree.visits[child])
+        if score > best_score:
+            best, best_score = child, score
+    return best
+
+
+def build(num_children, seed=0):
+    """
+    :return: MCTS -- a search whose root has num_children expanded children with random statistics
+    """
+    rng = random.Random(seed)
+    search_tree = MCTS(0, chess.WHITE, tt_size=0)
+    search_tree.tree = tree = Tree()
+    tree.add_root(chess.BLACK)
+    start = tree.add_children(0, [chess.Move.null()] * num_children)
+    tree.num_children[0] = num_children
+    for child in range(start, start + num_children):
+        tree.visits[child] = rng.randint(1, 200)
+        tree.wins[child] = rng.random() * tree.visits[child]
+    tree.visits[0] = tree.visits[start:start + num_children].sum()
+    return search_tree
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Selection cost per node for different numbers of children.')
+    parser.add_argument('--repeats', type=int, default=20000)
+    args = parser.parse_args()
+
+    for num_children in (20, 40, 80):
+        search_tree = build(num_children)
+        tree = search_tree.tree
+        vectorized = timeit.timeit(lambda: np.argmax(search_tree.UCT(0)), number=args.repeats) / args.repeats
+        scalar = timeit.timeit(lambda: scalar_select(tree, 0), number=args.repeats // 10) / (args.repeats // 10)
+        assert tree.first_child[0] + np.argmax(search_tree.UCT(0)) == scalar_select(tree, 0)
+        print('{:3d} children  vectorized {:7.2f} us  scalar {:8.2f} us  ({:.1f}x)'.format(
+            num_children, vectorized * 1e6, scalar * 1e6, scalar / vectorized))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      evaluation.py
+Authors:        Jeremy Webb
+
+Description:    Fast static evaluation used to score rollouts that are cut off before a king is captured. Works
+                directly on the board's bitboards.
+"""
+
+import math
+import chess
+
+PAWN_VALUE, KNIGHT_VALUE, BISHOP_VALUE, ROOK_VALUE, QUEEN_VALUE = 100, 320, 330, 500, 900
+
+# a king that can be captured right now is nearly lost in recon chess
+KING_ATTACKER_PENALTY = 400
+KING_SHELTER_BONUS = 15
+
+# centipawns per factor of 10 in the odds of winning. rollouts are noisy so a queen up is kept well short of a
+# certain win
+SCALE = 1000
+
+
+def material(board, color):
+    """
+    :param board: chess.Board -- board to evaluate
+    :param color: chess.WHITE/chess.BLACK -- side to count
+    :return: int -- material of color in centipawns
+    """
+    own = board.occupied_co[color]
+    return ((board.pawns & own).bit_count() * PAWN_VALUE + (board.knights & own).bit_count() * KNIGHT_VALUE +
+            (board.bishops & own).bit_count() * BISHOP_VALUE + (board.rooks & own).bit_count() * ROOK_VALUE +
+            (board.queens & own).bit_count() * QUEEN_VALUE)
+
+
+def king_safety(board, color):
+    """
+    Penalises enemy pieces that attack the king square and rewards own pieces next to the king.
+
+    :param board: chess.Board -- board to evaluate
+    :param color: chess.WHITE/chess.BLACK -- side whose king is scored
+    :return: int -- king safety of color in centipawns
+    """
+    king = board.kings & board.occupied_co[color]
+    if not king:
+        return -10 * KING_ATTACKER_PENALTY
+    square = chess.msb(king)
+    attackers = chess.popcount(board.attackers_mask(not color, square))
+    shelter = chess.popcount(chess.BB_KING_ATTACKS[square] & board.occupied_co[color])
+    return shelter * KING_SHELTER_BONUS - attackers * KING_ATTACKER_PENALTY
+
+
+def evaluate(board, color):
+    """
+    Maps the material and king safety balance to a win probability for color with a logistic curve.
+
+    :param board: chess.Board -- board to evaluate
+    :param color: chess.WHITE/chess.BLACK -- side the probability is for
+    :return: float -- estimated probability that color wins, between 0 and 1
+    """
+    score = material(board, color) - material(board, not color) + \
+        king_safety(board, color) - king_safety(board, not color)
+    return 1 / (1 + math.pow(10, -score / SCALE))
@@ -11,6 +11,7 @@ Source:         Adapted from recon-chess (https://pypi.org/project/reconchess/)
 
 import chess
 from datetime import datetime
+from tables import ALL_SQUARES, SENSE_SQUARES, PAWN_ATTACK_SQUARES, BACK_RANK_SQUARES
 
 
 class Game:
@@ -96,7 +97,7 @@ class Game:
         no_opponents_board = self._without_opponent_pieces(board, turn)
 
         for pawn_square in board.pieces(chess.PAWN, turn):
-            for attacked_square in board.attacks(pawn_square):
+            for attacked_square in PAWN_ATTACK_SQUARES[turn][pawn_square]:
                 # skip this square if one of our own pieces are on the square
                 if no_opponents_board.piece_at(attacked_square):
                     continue
@@ -104,7 +105,7 @@ class Game:
                 pawn_capture_moves.append(chess.Move(pawn_square, attacked_square))
 
                 # add in promotion moves
-                if attacked_square in chess.SquareSet(chess.BB_BACKRANKS):
+                if attacked_square in BACK_RANK_SQUARES:
                     for piece_type in chess.PIECE_TYPES[1:-1]:
                         pawn_capture_moves.append(chess.Move(pawn_square, attacked_square, promotion=piece_type))
 
@@ -176,9 +177,9 @@ class Game:
         return None
     
     def _add_pawn_queen_promotion(self, move):
-        back_ranks = list(chess.SquareSet(chess.BB_BACKRANKS))
         piece = self.truth_board.piece_at(move.from_square)
-        if piece is not None and piece.piece_type == chess.PAWN and move.to_square in back_ranks and move.promotion is None:
+        if piece is not None and piece.piece_type == chess.PAWN and move.to_square in BACK_RANK_SQUARES and \
+                move.promotion is None:
             move = chess.Move(move.from_square, move.to_square, chess.QUEEN)
         return move
     
@@ -253,16 +254,11 @@ class Game:
         :return: A list of tuples, where each tuple contains a :class:`Square` in the sense, and if there
                  was a piece on the square, then the corresponding :class:`chess.Piece`, otherwise `None`.
         """
-        if square not in list(chess.SQUARES):
+        if square not in ALL_SQUARES:
             return []
         
-        rank, file = chess.square_rank(square), chess.square_file(square)
-        sense_result = []
-        for delta_rank in [1, 0, -1]:
-            for delta_file in [-1, 0, 1]:
-                if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7:
-                    sense_square = chess.square(file + delta_file, rank + delta_rank)
-                    sense_result.append((sense_square, self.truth_board.piece_at(sense_square)))
+        sense_result = [(sense_square, self.truth_board.piece_at(sense_square))
+                        for sense_square in SENSE_SQUARES[square]]
         
         #update sense result for each respective color board
         if self.turn == chess.WHITE:
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      history.py
+Authors:        Jeremy Webb
+
+Description:    History heuristic shared across searches. MyAgent keeps one table for the whole game; after every
+                search the visit shares of well visited nodes are added to it and older entries decay, so moves the
+                search liked recently are tried earlier at expansion and more often in rollouts.
+"""
+
+import numpy as np
+import chess
+from tree import decode_move
+
+
+class HistoryTable:
+    """
+    Fixed size table of scores keyed by (color, piece type, from square, to square), about 230 KB whatever the
+    length of the game.
+    """
+
+    def __init__(self, decay=0.8, strength=1.0, min_visits=32):
+        """
+        :param decay: float -- factor all scores are multiplied by before each update
+        :param strength: float -- weight of the best scored move relative to an unscored one, minus one. Weights run
+                         from 1 for unscored moves to 1 + strength. Rollouts draw about 1 + strength moves per ply
+        :param min_visits: int -- nodes with fewer visits are too noisy to learn from
+        """
+        self.decay = decay
+        self.strength = strength
+        self.min_visits = min_visits
+        self.scores = np.zeros((2, 7, 64, 64), dtype=np.float32)
+        self.updates = 0
+
+    def move_weights(self, board, moves):
+        """
+        :param board: chess.Board -- position the moves are played from
+        :param moves: List(chess.Move) -- moves to weigh, the null move weighs 1
+        :return: np.ndarray -- sampling weight of every move
+        """
+        best = self.scores.max()
+        if best <= 0 or not moves:
+            return np.ones(len(moves))
+        table = self.scores[int(board.turn)]
+        piece_types = [board.piece_type_at(move.from_square) or 0 for move in moves]
+        from_squares = [move.from_square for move in moves]
+        to_squares = [move.to_square for move in moves]
+        scores = table[piece_types, from_squares, to_squares]
+        scores[[not move for move in moves]] = 0
+        return 1.0 + self.strength * scores / best
+
+    def acceptance(self):
+        """
+        Lookup used by the rollouts to bias their moves by rejection: a drawn move is kept with probability
+        weight / (1 + strength), so sampling stays O(1) per draw and the move tables are untouched.
+
+        :return: List(List(float)) -- per color (chess.BLACK = 0), the keep probability at
+                 piece_type * 4096 + from_square + 64 * to_square. None while the table is empty
+        """
+        best = self.scores.max()
+        if best <= 0:
+            return None
+        keep = (1.0 + self.strength * self.scores / best) / (1.0 + self.strength)
+        return [keep[int(color)].transpose(0, 2, 1).reshape(-1).tolist() for color in (chess.BLACK, chess.WHITE)]
+
+    def record(self, board, visits):
+        """
+        Adds the visit share of every move of one node.
+
+        :param board: chess.Board -- position at the node
+        :param visits: dict -- chess.Move -> visits of its child
+        """
+        total = sum(visits.values())
+        if total <= 0:
+            return
+        table = self.scores[int(board.turn)]
+        for move, count in visits.items():
+            piece_type = board.piece_type_at(move.from_square) if move else None
+            if piece_type is not None:
+                table[piece_type, move.from_square, move.to_square] += count / total
+
+    def update(self, board, tree):
+        """
+        Decays the table and learns from every node of a finished search with at least min_visits visits.
+
+        :param board: chess.Board -- root position of the search
+        :param tree: Tree -- the search's statistics
+        """
+        self.scores *= self.decay
+        self.updates += 1
+        stack = [0]
+        boards = {0: board.copy(stack=False)}
+        while stack:
+            node = stack.pop()
+            node_board = boards.pop(node)
+            visits = {}
+            for child in tree.children(node):
+                if tree.visits[child] > 0:
+                    visits[tree.get_move(child)] = int(tree.visits[child])
+                if tree.visits[child] >= self.min_visits and tree.num_moves[child] > 0:
+                    child_board = node_board.copy(stack=False)
+                    child_board.push(tree.get_move(child))
+                    boards[child] = child_board
+                    stack.append(child)
+            self.record(node_board, visits)
+
+    def update_root(self, board, root_visits):
+        """
+        Like update for a search without a single tree (root parallelism): only the root moves are learnt.
+
+        :param board: chess.Board -- root position of the search
+        :param root_visits: dict -- encoded move -> [visits, wins], see MCTS.root_stats
+        """
+        self.scores *= self.decay
+        self.updates += 1
+        self.record(board, {decode_move(code): visits for code, (visits, wins) in root_visits.items()})
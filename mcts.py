@@ -1,128 +1,631 @@
+import math
 import random
 import chess
+import chess.polyglot
 import numpy as np
 import time
-from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+from tree import Tree, encode_move, decode_move
+from transposition import TranspositionTable
+from evaluation import evaluate
+from move_order import prior_order
+from search_stats import SearchStats
+from rollout import RolloutBoard, rollout
+from tactics import king_captures
+
+_pools = {}
+
+
+def _process_pool(workers):
+    # pools are kept for the lifetime of the process so each search does not pay the start up cost again
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def _root_search(args):
+    """
+    Worker entry point of a root-parallel search: runs an independent single process search of the root.
+
+    :return: Tuple(dict, dict, SearchStats) -- root child statistics, tree stats and search stats of the worker's
+             search
+    """
+    board, team, deadline, seed, options = args
+    search_tree = MCTS(deadline - time.time(), team, board, seed=seed, **options)
+    search_stats = search_tree.search(deadline)
+    return search_tree.root_stats(), search_tree.stats(), search_stats
+
+
+_rollout_search = None
+
+
+def _rollout(args):
+    """
+    Worker entry point of a tree-parallel search: plays one rollout from a leaf board.
+
+    :return: Tuple(float, int) -- result of the rollout for team and the plies it played
+    """
+    global _rollout_search
+    board, team, rollout_depth, tactics, seed = args
+    if _rollout_search is None:
+        _rollout_search = MCTS(0, team)
+    _rollout_search.rollout_depth = rollout_depth
+    _rollout_search.tactics = tactics
+    _rollout_search.rng.seed(seed)
+    result = _rollout_search.sim(board, team)
+    return result, _rollout_search.rollout_plies
+
+
+def captured_king(board):
+    """
+    Constant time check for a captured king using the king bitboards.
+
+    :param board: chess.Board -- board to check
+    :return: chess.WHITE/chess.BLACK -- the side whose king is gone, None if both kings are on the board
+    """
+    if not board.kings & board.occupied_co[chess.WHITE]:
+        return chess.WHITE
+    if not board.kings & board.occupied_co[chess.BLACK]:
+        return chess.BLACK
+    return None
 
 
 class MCTS:
 
-    def __init__(self, time_limit, player, board=chess.Board()):
+    def __init__(self, time_limit, player, board=chess.Board(), workers=1, seed=None, iterations=None,
+                 parallel='root', batch_size=None, tree=None, tt_size=2 ** 16, early_stop=True,
+                 rollout_depth=40, exploration=math.sqrt(2), fpu=float('inf'), widening=2.0, widening_alpha=0.5,
+                 max_nodes=None, max_mb=None, tactics=True, moves=None, history=None,
+                 prior_stats=None):
+        """
+        :param time_limit: float -- seconds to search for
+        :param player: chess.WHITE/chess.BLACK -- the side we are searching for
+        :param board: chess.Board -- root position
+        :param workers: int -- number of processes used when searching in parallel
+        :param seed: int -- seed for the search's random number generator, None to seed from the OS
+        :param iterations: int -- optional iteration budget (per worker for root parallelism), searches stop at
+                           whichever limit comes first
+        :param parallel: str -- 'root' runs independent searches of the root and merges their root statistics,
+                         'tree' grows one shared tree and runs batches of leaf rollouts in the pool
+        :param batch_size: int -- leaves selected per batch in tree-parallel mode, defaults to 2 * workers
+        :param tree: Tree -- statistics to continue from, e.g. the subtree kept from the previous turn. Its root must
+                     be board
+        :param tt_size: int -- entries in the transposition table shared by identical positions, 0 to disable
+        :param early_stop: bool -- stop before the deadline once the best root move can no longer be overtaken
+        :param rollout_depth: int -- plies a rollout plays before it is cut off and scored by the static evaluation
+        :param exploration: float -- exploration constant of UCT
+        :param fpu: float -- first play urgency, the score of an untried move. The default of infinity tries every
+                    move of a node before descending further
+        :param widening: float -- progressive widening constant C, a node with n visits has about C * n^alpha of its
+                         moves unlocked. 0 unlocks every move at once
+        :param widening_alpha: float -- progressive widening exponent alpha
+        :param max_nodes: int -- node budget of the tree (per worker for root parallelism). When it is reached the
+                          least visited subtrees are pruned and their storage is reused
+        :param max_mb: float -- node budget given in megabytes of tree storage instead of a node count
+        :param tactics: bool -- a side that can capture the enemy king always does (tactics.py): it is the only child
+                        expanded at such a node and rollouts take it at once
+        :param moves: List(chess.Move) -- root moves to search, e.g. the moves that save an attacked king. Defaults to
+                      the legal moves of board
+        :param history: HistoryTable -- move history of earlier searches (history.py). It biases the expansion order
+                        and the moves of single process rollouts, None for uniform priors
+        :param prior_stats: dict -- encoded root move -> [visits, wins] carried over from an earlier search, e.g. the
+                            replies kept from the previous turn that agree with what we observed. Those root moves
+                            start with these statistics, ignored when tree is given
+        """
         self.board_state = board
         self.limit = time_limit
         self.team = player
-        self.tree = None
-        self.moves = list(board.legal_moves)
+        self.tree = tree
+        self.prior_stats = prior_stats or {}
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.moves = list(board.legal_moves) if moves is None else list(moves)
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.max_iterations = iterations
+        self.parallel = parallel
+        self.batch_size = batch_size or 2 * workers
+        self.early_stop = early_stop
+        self.rollout_depth = rollout_depth
+        self.tactics = tactics
+        self.history = history
+        self.rollout_keep = history.acceptance() if history is not None else None
+        self.exploration = exploration
+        self.fpu = fpu
+        self.widening = widening
+        self.widening_alpha = widening_alpha
+        self.node_budget = max_nodes
+        if max_mb is not None:
+            budget = int(max_mb * 2 ** 20 // Tree(capacity=0).bytes_per_node)
+            self.node_budget = budget if max_nodes is None else min(max_nodes, budget)
+        self.pending = []  # leaves waiting for their rollout, kept valid when the tree is pruned
+        self.prunes = 0
+        self.merged = None
+        self.worker_stats = None
+        self.search_stats = SearchStats()  # filled in by the current search call
+        self.rollout_plies = 0  # length of the last rollout
+        # everything a root-parallel worker needs to run the same search
+        self.worker_options = {'iterations': iterations, 'tt_size': tt_size, 'early_stop': early_stop,
+                               'rollout_depth': rollout_depth, 'exploration': exploration, 'fpu': fpu,
+                               'widening': widening, 'widening_alpha': widening_alpha, 'max_nodes': max_nodes,
+                               'max_mb': max_mb, 'tactics': tactics, 'moves': moves, 'history': history}
+
+    def search(self, deadline=None):
+        """
+        Anytime search: runs until the deadline, the iteration budget, or until the best root move can no longer be
+        overtaken in the time that is left. Calling it again resumes from the current tree.
+
+        :param deadline: float -- time.time() to stop at, defaults to time_limit seconds from now
+        :return: SearchStats -- what this call did, including the best move found so far
+        """
+        start = time.perf_counter()
+        self.search_stats = search_stats = SearchStats()
+        if deadline is None:
+            deadline = time.time() + self.limit
+        if self.workers > 1 and self.parallel == 'root':
+            self.root_parallel_search(deadline)
+        elif self.workers > 1 and self.parallel == 'tree':
+            self.tree_parallel_search(deadline)
+        else:
+            start_time = time.time()
+            if self.tree is None:
+                self.reset()
+            count = 0
+            # always run at least one iteration so there is a move to return
+            while count == 0 or (time.time() < deadline and
+                                 (self.max_iterations is None or count < self.max_iterations)):
+                self.iterate()
+                count += 1
+                if count % 64 == 0 and self.decided(count, start_time, deadline):
+                    break
+        search_stats.elapsed = time.perf_counter() - start
+        search_stats.best_move = self.pick_move()
+        search_stats.root_visits = {decode_move(code).uci(): visits
+                                    for code, (visits, wins) in self.root_stats().items()}
+        search_stats.tree = self.stats()
+        return search_stats
+
+    def decided(self, count, start_time, deadline):
+        """
+        Checks whether the most visited root move is so far ahead that the runner up cannot catch it, even if every
+        remaining iteration went to the runner up.
+
+        :param count: int -- iterations run since start_time
+        :param start_time: float -- time.time() the current search call started
+        :param deadline: float -- time.time() the search will stop at
+        :return: bool -- True if the search can stop early
+        """
+        if not self.early_stop:
+            return False
+        now = time.time()
+        remaining = count / max(now - start_time, 1e-9) * (deadline - now)
+        if self.max_iterations is not None:
+            remaining = min(remaining, self.max_iterations - count)
+        visits = sorted((v for v, w in self.root_stats().values()), reverse=True) + [0, 0]
+        return visits[0] - visits[1] > remaining
 
-    def search(self):
+    def root_parallel_search(self, deadline):
+        """
+        Runs `workers` independent searches of the root in the process pool until the deadline and adds the visit
+        and win counts of the root's children to the merged statistics.
+        """
+        seeds = [self.rng.getrandbits(32) for i in range(self.workers)]
+        jobs = [(self.board_state, self.team, deadline, seed, self.worker_options) for seed in seeds]
+        if self.merged is None:
+            self.merged = {code: list(stats) for code, stats in self.prior_stats.items()}
+            self.worker_stats = []
+        for child_stats, tree_stats, search_stats in _process_pool(self.workers).map(_root_search, jobs):
+            for code, (visits, wins) in child_stats.items():
+                merged = self.merged.setdefault(code, [0, 0.0])
+                merged[0] += visits
+                merged[1] += wins
+            self.worker_stats.append(tree_stats)
+            self.search_stats.merge(search_stats)
+
+    def tree_parallel_search(self, deadline):
+        """
+        Grows a single tree: a batch of leaves is selected with virtual loss so the selections spread apart, their
+        rollouts run in the process pool, and the results are backed up together.
+        """
         start_time = time.time()
-        root = {'state': self.board_state, 'actions': self.moves, 'turn': self.team, 'num_wins': 0, 'num_sims': 0, 'children': []}
-        while time.time() - start_time < self.limit:
-            selected = self.sel(root)
-            new_node = self.expand(selected)
-            selected['children'].append(new_node)
-            result = self.sim(new_node['state'].copy(), self.team)
-            self.backprop(new_node, result)
-        self.tree = root
+        if self.tree is None:
+            self.reset()
+        count = 0
+        while count == 0 or (time.time() < deadline and (self.max_iterations is None or count < self.max_iterations)):
+            batch = self.batch_size
+            if self.max_iterations is not None:
+                batch = min(batch, self.max_iterations - count)
+            leaves, jobs = self.pending, []
+            times = self.search_stats.phase_times
+            for i in range(batch):
+                if self.node_budget is not None and leaves and self.tree.size >= self.node_budget:
+                    break  # play the batch so far first, a prune then only has to keep the path being expanded
+                board = self.board_state.copy(stack=False)
+                t0 = time.perf_counter()
+                selected = self.sel(0, board)
+                t1 = time.perf_counter()
+                leaf = self.expand(selected, board)
+                self.virtual_loss(leaf, 1)
+                times['select'] += t1 - t0
+                times['expand'] += time.perf_counter() - t1
+                leaves.append(leaf)
+                jobs.append((board, self.team, self.rollout_depth, self.tactics, self.rng.getrandbits(32)))
+            t0 = time.perf_counter()
+            results = _process_pool(self.workers).map(_rollout, jobs, chunksize=max(1, batch // self.workers))
+            results = list(results)
+            t1 = time.perf_counter()
+            for leaf, (result, plies) in zip(leaves, results):
+                self.virtual_loss(leaf, -1)
+                self.backprop(leaf, float(result))
+                self.search_stats.add_rollout(int(plies))
+            times['simulate'] += t1 - t0
+            times['backprop'] += time.perf_counter() - t1
+            self.search_stats.iterations += len(leaves)
+            count += len(leaves)
+            self.pending = []
+            if self.decided(count, start_time, deadline):
+                break
+
+    def virtual_loss(self, node, amount):
+        """
+        Counts `amount` lost visits on the path from node to the root, or takes them back when negative.
+        """
+        tree = self.tree
+        while node != -1:
+            tree.visits[node] += amount
+            node = tree.parent[node]
+
+    def reset(self):
+        """
+        Starts a fresh tree rooted at board_state. Root moves with prior statistics come first and start expanded.
+        """
+        self.tree = Tree()
+        self.add_root()
+        moves = prior_order(self.board_state, self.moves.copy() or [chess.Move.null()], self.rng, self.history)
+        known = [move for move in moves if encode_move(move) in self.prior_stats]
+        start = self.tree.add_children(0, known + [move for move in moves if encode_move(move) not in self.prior_stats])
+        tree = self.tree
+        for child, move in enumerate(known, start):
+            tree.visits[child], tree.wins[child] = self.prior_stats[encode_move(move)]
+            if self.tt is not None:
+                board = self.board_state.copy(stack=False)
+                board.push(move)
+                tree.key[child] = chess.polyglot.zobrist_hash(board)
+                self.tt.store(int(tree.key[child]))
+        tree.num_children[0] = len(known)
+        # root wins are counted for the side that moved into the root, its children's for the other side
+        tree.visits[0] = tree.visits[start:start + len(known)].sum()
+        tree.wins[0] = tree.visits[0] - tree.wins[start:start + len(known)].sum()
+
+    def add_root(self):
+        """
+        Adds the root of a fresh tree, stored in the transposition table.
+        """
+        key = 0
+        if self.tt is not None:
+            key = chess.polyglot.zobrist_hash(self.board_state)
+            self.tt.store(key)
+        self.tree.add_root(not self.board_state.turn, key)
+
+    def iterate(self):
+        """
+        Runs a single select/expand/simulate/backprop iteration on the current tree. The root board is copied once
+        and every later step only pushes moves onto that copy.
+        """
+        board = self.board_state.copy(stack=False)
+        t0 = time.perf_counter()
+        selected = self.sel(0, board)
+        t1 = time.perf_counter()
+        new_node = self.expand(selected, board)
+        t2 = time.perf_counter()
+        result = self.sim(board, self.team)
+        t3 = time.perf_counter()
+        self.backprop(new_node, result)
+        self.search_stats.add_iteration(t1 - t0, t2 - t1, t3 - t2, time.perf_counter() - t3, self.rollout_plies)
+
+    def root_stats(self):
+        """
+        :return: dict -- encoded root move -> [visits, wins], summed over all workers after a root-parallel search
+        """
+        if self.merged is not None:
+            return self.merged
+        tree = self.tree
+        return {int(tree.move[c]): [int(tree.visits[c]), float(tree.wins[c])] for c in tree.children(0)}
 
     def pick_move(self):
-        evaluation = [c['num_wins'] / c['num_sims'] for c in self.tree['children']]
-        return self.tree['children'][evaluation.index(min(evaluation))]
+        stats = self.root_stats()
+        best = max(stats, key=lambda code: (stats[code][0], stats[code][1], code))
+        return decode_move(best)
+
+    def stats(self):
+        """
+        :return: dict -- number of nodes in the tree, the bytes held by its statistic arrays, the number of visited
+                 nodes per depth and the transposition table's hit rate and size (summed over the workers of a
+                 root-parallel search)
+        """
+        if self.worker_stats is not None:
+            stats = {key: sum(s.get(key, 0) for s in self.worker_stats)
+                     for key in ('nodes', 'bytes', 'prunes', 'tt_lookups', 'tt_hits', 'tt_bytes')}
+            stats['tt_hit_rate'] = stats['tt_hits'] / stats['tt_lookups'] if stats['tt_lookups'] else 0.0
+            histograms = [s['depth_histogram'] for s in self.worker_stats]
+            stats['depth_histogram'] = [sum(h[d] for h in histograms if d < len(h))
+                                        for d in range(max(len(h) for h in histograms))]
+            return stats
+        stats = {'nodes': self.tree.size, 'bytes': self.tree.nbytes, 'prunes': self.prunes,
+                 'depth_histogram': self.tree.depth_histogram()}
+        if self.tt is not None:
+            stats.update(self.tt.stats())
+        return stats
 
     def backprop(self, node, result):
-        curr_node = node
-        team = node['turn']
-        while 1:
-            curr_node['num_sims'] = curr_node['num_sims'] + 1
-            if team == curr_node['turn']:
-                if result == 1:
-                    curr_node['num_wins'] = curr_node['num_wins'] + 1
-                elif result == .5:
-                    curr_node['num_wins'] = curr_node['num_wins'] + .5
-            else:
-                if result == 0:
-                    curr_node['num_wins'] = curr_node['num_wins'] + 1
-                elif result == .5:
-                    curr_node['num_wins'] = curr_node['num_wins'] + .5
-            if 'parent' not in curr_node.keys():
+        # a node's wins are counted for the side that made the move into it
+        tree = self.tree
+        while node != -1:
+            score = result if tree.color[node] == self.team else 1 - result
+            tree.visits[node] += 1
+            tree.wins[node] += score
+            if self.tt is not None:
+                self.tt.update(int(tree.key[node]), score)
+            node = tree.parent[node]
+
+    def expand(self, node, board):
+        tree = self.tree
+        if tree.num_moves[node] == -1:
+            # first visit: reserve the child block in the order moves get unlocked. capturing the king wins, so no
+            # other move needs a child
+            moves = (self.tactics and king_captures(board)) or list(board.pseudo_legal_moves) or [chess.Move.null()]
+            # while leaves of the batch wait for their rollouts the tree may grow past the budget by this block,
+            # their paths would keep most of it and the next expansions would prune again at once
+            if self.node_budget is not None and tree.size + len(moves) > self.node_budget and not self.pending:
+                node = self.prune(node)
+            tree.add_children(node, prior_order(board, moves, self.rng, self.history))
+        if tree.num_children[node] >= self.unlocked(node):  # a king has been captured, nothing left to expand
+            return node
+        child = tree.first_child[node] + tree.num_children[node]
+        tree.num_children[node] += 1
+        board.push(tree.get_move(child))
+        if captured_king(board) is not None:
+            tree.add_children(child, [])
+        if self.tt is not None:
+            tree.key[child] = chess.polyglot.zobrist_hash(board)
+            self.tt.store(int(tree.key[child]))
+        return int(child)
+
+    def sel(self, root, board):
+        # walk down from the root along the best UCT child, stopping at a node whose untried moves score best (or that
+        # is terminal or not expanded yet). moves are replayed onto board on the way down
+        tree = self.tree
+        node = root
+        while tree.num_moves[node] > 0:
+            best = int(np.argmax(self.UCT(node)))
+            if best >= tree.num_children[node]:
                 break
-            else:
-                curr_node = curr_node['parent']
-
-    def expand(self, node):
-        board_copy = copy(node['state'])
-        moves = node['actions'].copy()
-        if len(moves) == 0:
-            moves.append(chess.Move.null())
-        move = random.choice(moves)
-        moves.remove(move)
-        node['actions'] = moves
-        board_copy.push(move)
-        return {'parent': node, 'actions': list(board_copy.pseudo_legal_moves), 'move': move, 'state': board_copy, 'turn': node['turn'] * -1, 'num_wins': 0, 'num_sims': 0, 'children': []}
-
-    def sel(self, root):
-        if len(root['children']) == 0:
-            return root
-        stack = [root]
-        sel_node = root
-        curr_max = 0
-        while len(stack) != 0:
-            curr_node = stack.pop()
-            uct = self.UCT(curr_node)
-            if uct > curr_max:
-                curr_max = uct
-                sel_node = curr_node
-            for c in curr_node['children']:
-                stack.append(c)
-        return sel_node
+            node = int(tree.first_child[node]) + best
+            board.push(tree.get_move(node))
+        return node
+
+    def prune(self, node):
+        """
+        Frees half of the node budget by collapsing the least visited subtrees. The path to node and to every leaf
+        waiting for its rollout is kept, batches are cut short at the budget so none are waiting by the time it
+        runs.
+
+        :param node: int -- the node being expanded
+        :return: int -- index of node after the tree has been compacted
+        """
+        remap = self.tree.prune(self.node_budget // 2, [node] + self.pending)
+        self.pending[:] = [int(remap[leaf]) for leaf in self.pending]
+        self.prunes += 1
+        return int(remap[node])
+
+    def unlocked(self, node):
+        """
+        :param node: int -- an expanded node
+        :return: int -- number of the node's moves that progressive widening currently allows
+        """
+        tree = self.tree
+        if not self.widening:
+            return int(tree.num_moves[node])
+        allowed = max(1, int(self.widening * (tree.visits[node] + 1) ** self.widening_alpha))
+        return min(max(allowed, int(tree.num_children[node])), int(tree.num_moves[node]))
 
     def UCT(self, node):
-        if 'parent' not in node.keys():
-            return node['num_wins'] / node['num_sims'] + np.sqrt(2) * np.sqrt(np.log(node['num_sims']) / node['num_sims'])
-        else:
-            return node['num_wins'] / node['num_sims'] + np.sqrt(2) * np.sqrt(np.log(node['parent']['num_sims']) / node['num_sims'])
-
-    def sim(self, board, team, n=150):
-        curr_state = board
-        i = 0
-        while i < n:
-            board_copy = copy(curr_state)
-            if board_copy.fen().split()[0].lower().count('k') < 2:
-                winner = chess.WHITE if board.copy().fen().split()[0].count('k') == 0 else chess.BLACK
-                if winner == team:
-                    return 1
-                else:
-                    return 0
-            else:
-                possible_moves = list(board_copy.pseudo_legal_moves)
-                possible_moves.append(chess.Move.null())
-                next_move = random.choice(possible_moves)
-                board_copy.push(next_move)
-                curr_state = board_copy
-            i = i + 1
-        return .5
+        """
+        Scores the unlocked child slots of a node in one vectorized expression: expanded children get their UCT
+        value and untried moves the first play urgency.
+
+        :param node: int -- an expanded node
+        :return: np.ndarray -- one score per unlocked child slot
+        """
+        tree = self.tree
+        start = tree.first_child[node]
+        expanded = slice(start, start + tree.num_children[node])
+        sims = tree.visits[expanded]
+        wins = tree.wins[expanded]
+        if self.tt is not None:
+            # positions that were reached through other move orders as well share their statistics
+            slots = self.tt.lookup_many(tree.key[expanded])
+            shared = (slots != -1) & (self.tt.visits[slots] > sims)
+            sims = np.where(shared, self.tt.visits[slots], sims)
+            wins = np.where(shared, self.tt.wins[slots], wins)
+        scores = np.full(self.unlocked(node), self.fpu)
+        if len(sims):
+            safe = np.maximum(sims, 1)
+            explore = self.exploration * math.sqrt(math.log(max(tree.visits[node], 1)))
+            scores[:len(sims)] = np.where(sims > 0, wins / safe + explore / np.sqrt(safe), self.fpu)
+        return scores
+
+    def sim(self, board, team, n=None):
+        # plays random requested moves on a rollout board (rollout.py) built from board, following the referee's
+        # rules. rollouts that reach the depth cutoff without a captured king are scored by the static evaluation. the
+        # number of plies played is left in rollout_plies
+        loser = captured_king(board)
+        if loser is not None:
+            self.rollout_plies = 0
+            return 1 if loser != team else 0
+        rollout_board = RolloutBoard.from_board(board)
+        result, self.rollout_plies = rollout(rollout_board, team, self.rollout_depth if n is None else n, self.rng,
+                                             self.tactics, self.rollout_keep)
+        if result is None:
+            result = evaluate(rollout_board.to_board(), team)
+        return result
 
     def build_example_tree(self, board, player):
-        root = {'state': board, 'turn': player, 'num_wins': 11, 'num_sims': 21, 'children': []}
-        node1 = {'parent': root, 'state': board, 'turn': player * -1, 'num_wins': 7, 'num_sims': 10, 'children': []}
-        node2 = {'parent': root, 'state': board, 'turn': player * -1, 'num_wins': 0, 'num_sims': 3, 'children': []}
-        node3 = {'parent': root, 'state': board, 'turn': player * -1, 'num_wins': 3, 'num_sims': 8, 'children': []}
-        root['children'].append(node1)
-        root['children'].append(node2)
-        root['children'].append(node3)
-        node4 = {'parent': node1, 'state': board, 'turn': player, 'num_wins': 2, 'num_sims': 4, 'children': []}
-        node5 = {'parent': node1, 'state': board, 'turn': player, 'num_wins': 1, 'num_sims': 6, 'children': []}
-        node1['children'].append(node4)
-        node1['children'].append(node5)
-        node6 = {'parent': node3, 'state': board, 'turn': player, 'num_wins': 1, 'num_sims': 2, 'children': []}
-        node7 = {'parent': node3, 'state': board, 'turn': player, 'num_wins': 2, 'num_sims': 3, 'children': []}
-        node8 = {'parent': node3, 'state': board, 'turn': player, 'num_wins': 2, 'num_sims': 3, 'children': []}
-        node3['children'].append(node6)
-        node3['children'].append(node7)
-        node3['children'].append(node8)
-        node9 = {'parent': node5, 'state': board, 'turn': player * -1, 'num_wins': 2, 'num_sims': 3, 'children': []}
-        node0 = {'parent': node5, 'state': board, 'turn': player * -1, 'num_wins': 3, 'num_sims': 3, 'children': []}
-        node5['children'].append(node9)
-        node5['children'].append(node0)
-        return root
+        tree = Tree()
+        tree.add_root(not player)
+        # (parent, number of children) in the order the blocks are reserved, then (wins, sims) for every node
+        blocks = [(0, 3), (1, 2), (3, 3), (5, 2)]
+        stats = [(11, 21), (7, 10), (0, 3), (3, 8), (2, 4), (1, 6), (1, 2), (2, 3), (2, 3), (2, 3), (3, 3)]
+        for parent, count in blocks:
+            tree.add_children(parent, [chess.Move.null()] * count)
+            tree.num_children[parent] = count
+        for node, (num_wins, num_sims) in enumerate(stats):
+            tree.wins[node] = num_wins
+            tree.visits[node] = num_sims
+        return tree
+
+
+class ISMCTS(MCTS):
+    """
+    Single observer information set MCTS. Every iteration samples one of the candidate boards for the true position
+    and all samples share one tree keyed by our own move sequence: the opponent's replies are hidden from us, so they
+    are played at random during the descent and not stored. Moves that cannot be played on the sampled board are
+    skipped during selection.
+    """
+
+    def __init__(self, time_limit, player, boards, weights=None, **options):
+        """
+        :param time_limit: float -- seconds to search for
+        :param player: chess.WHITE/chess.BLACK -- the side we are searching for, to move on every board
+        :param boards: List(chess.Board) -- candidate boards for the true position
+        :param weights: List(float) -- how likely each board is, uniform by default
+        :param options: further keyword arguments of MCTS. The search always runs in this process and without the
+                        transposition table, positions differ between samples
+        """
+        options.update(workers=1, tt_size=0)
+        super().__init__(time_limit, player, boards[0], **options)
+        self.boards = list(boards)
+        self.weights = weights
+        # our root moves are the union over the candidates, in the order they were first seen
+        moves = {}
+        for board in self.boards:
+            for move in board.legal_moves:
+                moves.setdefault(move, None)
+        self.moves = list(moves)
+
+    def sample(self):
+        """
+        :return: chess.Board -- a copy of a candidate board drawn by weight
+        """
+        if self.weights is None:
+            board = self.rng.choice(self.boards)
+        else:
+            board = self.rng.choices(self.boards, self.weights)[0]
+        return board.copy(stack=False)
+
+    def add_root(self):
+        # the root stands for every candidate board, it has no single key
+        self.tree.add_root(not self.team)
+
+    def iterate(self):
+        """
+        Runs one iteration on a sampled board.
+        """
+        board = self.sample()
+        t0 = time.perf_counter()
+        node, slot, result = self.sel(0, board)
+        t1 = time.perf_counter()
+        if result is None and slot != -1:
+            node, result = self.expand(node, board, slot)
+        t2 = time.perf_counter()
+        if result is None:
+            result = self.sim(board, self.team)
+        else:
+            self.rollout_plies = 0
+        t3 = time.perf_counter()
+        self.backprop(node, result)
+        self.search_stats.add_iteration(t1 - t0, t2 - t1, t3 - t2, time.perf_counter() - t3, self.rollout_plies)
+
+    def available(self, node, board):
+        """
+        :param node: int -- an expanded node
+        :param board: chess.Board -- the sampled board at that node
+        :return: np.ndarray -- for every slot of the node's block, whether its move can be played on board
+        """
+        tree = self.tree
+        moves = board.legal_moves if node == 0 else board.pseudo_legal_moves
+        codes = [encode_move(move) for move in moves] or [0]
+        start = tree.first_child[node]
+        return np.isin(tree.move[start:start + tree.num_moves[node]], codes)
+
+    def sel(self, root, board):
+        """
+        Walks down along the best UCT child among the moves that can be played on the sampled board, playing a random
+        opponent reply after each of our moves.
+
+        :param root: int -- node to start from
+        :param board: chess.Board -- sampled board at root, moves are pushed onto it
+        :return: Tuple(int, int, float) -- the node reached, the slot of its block to expand next (-1 for none) and
+                 the result if a king was captured on the way (None otherwise)
+        """
+        tree = self.tree
+        node = root
+        while tree.num_moves[node] != -1:
+            available = self.available(node, board)
+            scores = np.where(available[:self.unlocked(node)], self.UCT(node), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] == -np.inf:
+                # none of the unlocked moves exist on this board, expand the first untried one that does
+                untried = np.nonzero(available[tree.num_children[node]:])[0]
+                return node, int(tree.num_children[node] + untried[0]) if len(untried) else -1, None
+            if best >= tree.num_children[node]:
+                return node, best, None
+            node = int(tree.first_child[node]) + best
+            result = self.play(board, tree.get_move(node))
+            if result is not None:
+                return node, -1, result
+        return node, 0, None
+
+    def expand(self, node, board, slot):
+        """
+        Adds the move in a slot of the node's block as its next child and plays it on the sampled board.
+
+        :param node: int -- the node to expand, its block is reserved from board on the first visit
+        :param board: chess.Board -- sampled board at node
+        :param slot: int -- position of the move within the block
+        :return: Tuple(int, float) -- the new child and the result if a king was captured (None otherwise)
+        """
+        tree = self.tree
+        if tree.num_moves[node] == -1:
+            moves = list(board.pseudo_legal_moves) or [chess.Move.null()]
+            if self.node_budget is not None and tree.size + len(moves) > self.node_budget:
+                node = self.prune(node)
+            start = tree.add_children(node, prior_order(board, moves, self.rng, self.history))
+            tree.color[start:start + len(moves)] = self.team  # every edge is one of our moves
+        start = tree.first_child[node]
+        child = start + tree.num_children[node]
+        # untried moves hold no statistics, so the chosen one can simply swap places with the next free slot
+        tree.move[child], tree.move[start + slot] = tree.move[start + slot], tree.move[child]
+        tree.num_children[node] += 1
+        return int(child), self.play(board, tree.get_move(child))
+
+    def play(self, board, move):
+        """
+        Plays one of our moves followed by a random opponent reply, which captures our king whenever it can if tactics
+        are on.
 
+        :param board: chess.Board -- sampled board, we are to move
+        :param move: chess.Move -- our move
+        :return: float -- 1 or 0 if a king was captured, None if the game goes on
+        """
+        board.push(move)
+        loser = captured_king(board)
+        if loser is None:
+            replies = self.tactics and king_captures(board)
+            if not replies:
+                replies = list(board.pseudo_legal_moves)
+                replies.append(chess.Move.null())
+            board.push(self.rng.choice(replies))
+            loser = captured_king(board)
+        if loser is None:
+            return None
+        return 1 if loser != self.team else 0
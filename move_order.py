@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      move_order.py
+Authors:        Jeremy Webb
+
+Description:    Cheap move ordering used when a node's child block is reserved. With progressive widening only the
+                first few moves of a block are unlocked at first, so the order decides what the search looks at.
+"""
+
+import chess
+
+# value of the piece on the target square, the king is worth the game
+VICTIM_ORDER = {chess.PAWN: 1, chess.KNIGHT: 2, chess.BISHOP: 3, chess.ROOK: 4, chess.QUEEN: 5, chess.KING: 10}
+
+
+def attacks_from(piece_type, color, square, occupied):
+    """
+    :param piece_type: int -- type of the piece
+    :param color: bool -- color of the piece
+    :param square: int -- square the piece stands on
+    :param occupied: int -- occupancy bitboard the sliding pieces are blocked by
+    :return: int -- bitboard of the squares the piece attacks
+    """
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[color][square]
+    if piece_type == chess.KNIGHT:
+        return chess.BB_KNIGHT_ATTACKS[square]
+    if piece_type == chess.KING:
+        return chess.BB_KING_ATTACKS[square]
+    attacks = 0
+    if piece_type in (chess.BISHOP, chess.QUEEN):
+        attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    if piece_type in (chess.ROOK, chess.QUEEN):
+        attacks |= chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] | \
+            chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied]
+    return attacks
+
+
+def prior_order(board, moves, rng, history=None):
+    """
+    Orders moves as captures (most valuable victim first), then moves that attack the enemy king from their target
+    square, then everything else. Moves are shuffled within each group, with a history table the shuffle favours
+    moves by their history weight.
+
+    :param board: chess.Board -- position the moves are played from
+    :param moves: List(chess.Move) -- moves to order
+    :param rng: random.Random -- generator for the shuffles
+    :param history: HistoryTable -- history of earlier searches, None for a uniform shuffle
+    :return: List(chess.Move) -- the ordered moves
+    """
+    if history is None:
+        rng.shuffle(moves)
+    else:
+        # weighted shuffle: sorting by u ** (1 / weight) draws the moves without replacement in proportion to weight
+        random = rng.random
+        keys = [random() ** (1.0 / weight) for weight in history.move_weights(board, moves).tolist()]
+        moves = [move for key, move in sorted(zip(keys, moves), key=lambda pair: -pair[0])]
+    enemy = board.occupied_co[not board.turn]
+    enemy_king = board.kings & enemy
+    captures, king_attacks, rest = [], [], []
+    for move in moves:
+        if not move:  # null move
+            rest.append(move)
+            continue
+        target = chess.BB_SQUARES[move.to_square]
+        if target & enemy:
+            captures.append(move)
+            continue
+        piece_type = move.promotion or board.piece_type_at(move.from_square)
+        if piece_type is not None and enemy_king and \
+                attacks_from(piece_type, board.turn, move.to_square,
+                             board.occupied & ~chess.BB_SQUARES[move.from_square]) & enemy_king:
+            king_attacks.append(move)
+        else:
+            rest.append(move)
+    captures.sort(key=lambda move: -VICTIM_ORDER[board.piece_type_at(move.to_square)])
+    return captures + king_attacks + rest
@@ -11,19 +11,66 @@ Source:         Adapted from recon-chess (https://pypi.org/project/reconchess/)
 
 
 
+import json
+import os
 import random
+import time
 from player import Player
-from mcts import MCTS
+from mcts import MCTS, ISMCTS
+from tree import encode_move
+from time_manager import TimeManager
+from tactics import forced_move
+from search_stats import SearchStats
+from history import HistoryTable
+from belief import Belief
+from sense import choose_sense
+from tables import BACK_RANK_SQUARES
+from reconcile import reconcile
 import chess
 
 
 # TODO: Rename this class to what you would like your bot to be named during the game.
 class MyAgent(Player):
 
-    def __init__(self):
+    def __init__(self, workers=1, search_options=None, stats_dir=None, seed=None, particles=10000, candidates=0,
+                 sense_samples=2048, reuse_difference=4):
+        """
+        :param workers: int -- processes used by the root-parallel MCTS in choose_move
+        :param search_options: dict -- extra keyword arguments for MCTS, e.g. rollout_depth or an iteration budget
+        :param stats_dir: str -- directory to write one JSONL file of search stats per game to, None to not write them
+        :param seed: int -- seed for the agent's random choices and its searches, None to seed from the OS
+        :param particles: int -- candidate boards of the particle filter (belief.py) that tracks the opponent, 0 to
+                          track a single board with the repair heuristics instead
+        :param candidates: int -- search this many of the most likely boards of the particle filter with ISMCTS, 0 to
+                           search the most likely board with MCTS
+        :param sense_samples: int -- particles drawn to score the sense squares on
+        :param reuse_difference: int -- most squares the opponent's pieces may occupy differently on the believed board
+                                 and after a kept reply for that reply's root statistics to be carried over
+        """
 
         self.color = None
         self.current_board = None
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.search_options = search_options or {}
+        self.time_manager = TimeManager()
+        self.move_number = 0
+        self.search_tree = None  # the last search, kept until we know which move was taken
+        self.search_board = None  # the board that search was run from
+        self.kept_tree = None  # the last search tree, kept_node is our taken move in it and the opponent's turn
+        self.kept_node = None
+        self.kept_board = None
+        self.opponent_capture = None  # square the opponent captured on this turn, None if they did not
+        self.sense_result = []  # what this turn's sense showed
+        self.reused_visits = []  # visits carried over into each search
+        self.stats_dir = stats_dir
+        self.stats_file = None
+        self.history = HistoryTable()  # move priors learnt from every search of the game
+        self.particles = particles
+        self.candidates = candidates
+        self.belief = None
+        self.sense_samples = sense_samples
+        self.reuse_difference = reuse_difference
 
     def handle_game_start(self, color, board):
         """
@@ -37,7 +84,22 @@ class MyAgent(Player):
 
         self.color = color
         self.current_board = board
-        pass
+        self.move_number = 0
+        self.history = HistoryTable()
+        if self.particles:
+            self.belief = Belief(board, color, self.particles, seed=self.rng.getrandbits(32))
+        if self.stats_dir is not None:
+            os.makedirs(self.stats_dir, exist_ok=True)
+            # games of a batch start in the same second, in this process or another one, so the name carries the pid
+            # and a counter and the file is only ever created, never overwritten
+            stem = 'game-{}-{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), 'white' if color else 'black', os.getpid())
+            attempt, self.stats_file = 0, None
+            while self.stats_file is None:
+                name = '{}{}.jsonl'.format(stem, '-{}'.format(attempt) if attempt else '')
+                try:
+                    self.stats_file = open(os.path.join(self.stats_dir, name), 'x')
+                except FileExistsError:
+                    attempt += 1
 
     def handle_opponent_move_result(self, captured_piece, captured_square):
         """
@@ -47,17 +109,27 @@ class MyAgent(Player):
         :param captured_square: chess.Square - position where your piece was captured
         """
 
+        self.opponent_capture = captured_square if captured_piece else None
+        self.sense_result = []
+        if self.belief is not None:
+            if self.color == chess.WHITE and self.move_number == 0:
+                return  # white's first turn, the opponent has not moved yet
+            self.belief.opponent_moved(captured_square if captured_piece else None)
+            self.current_board = self.belief.most_likely()
+            return
+
         # if a piece was captured, check to see if we can figure out what move was made to capture it
         if captured_piece:
-            self.current_board.turn = not self.color
-            moves = list(self.current_board.pseudo_legal_moves)
-            for move in moves.copy(): # iterate through moves looking for one that captures our piece
-                if move.to_square != captured_square:
-                    moves.remove(move)
-            if len(moves) == 1: # if there was exactly one capture move, then obviously that was taken
-                self.current_board.push(moves[0])
+            attackers = self.current_board.attackers_mask(not self.color, captured_square)
+            if chess.popcount(attackers) == 1: # if exactly one piece could capture there, obviously that one did
+                from_square = chess.msb(attackers)
+                promotes = self.current_board.piece_type_at(from_square) == chess.PAWN and \
+                    captured_square in BACK_RANK_SQUARES
+                self.current_board.turn = not self.color
+                self.current_board.push(chess.Move(from_square, captured_square, chess.QUEEN if promotes else None))
             else: # otherwise (if either there were multiple or no options found), just sense that square
                 self.current_board.remove_piece_at(captured_square)
+            self.current_board.turn = self.color
 
 
 
@@ -73,43 +145,14 @@ class MyAgent(Player):
         :example: choice = chess.A1
         """
 
-        #need to remove edges of board for sense
-        smart_sense = possible_sense[8:-8]
-        sides = []
-        for sense in smart_sense:
-            if sense % 8 == 0:
-                sides.append(sense)
-            if sense % 8 == 7:
-                sides.append(sense)
-
-        smart_sense = [i for i in smart_sense if i not in sides]
-
-        our_pieces = []
-        for square in possible_sense:
-            if self.current_board.color_at(square) == self.color:
-                our_pieces.append(square)
-
-        sense = random.choice(smart_sense)
-
-        # a 3x3 square around sence
-        sense_area = [sense-9, sense-8, sense-7, sense-1, sense, sense+1, sense+7, sense+8, sense+9]
-
-        num_pieces = 0
-        for square in sense_area:
-            if self.current_board.color_at(square) == self.color:
-                num_pieces += 1
-
-        while num_pieces >= 5:
-            sense = random.choice(smart_sense)
-
-            # a 3x3 square around sence
-            sense_area = [sense-9, sense-8, sense-7, sense-1, sense, sense+1, sense+7, sense+8, sense+9]
-
-            num_pieces = 0
-            for square in sense_area:
-                if self.current_board.color_at(square) == self.color:
-                    num_pieces += 1
-
+        # the inner square whose 3x3 window the candidate boards disagree on most, the expected information gain
+        # of a sense is the entropy of what it will show. With a single board only our own pieces are avoided
+        if self.belief is not None:
+            boards, weights = self.belief.sample(self.sense_samples)
+        else:
+            boards, weights = self.current_board, None
+        sense, entropy = choose_sense(boards, weights, self.current_board.occupied_co[self.color], self.rng,
+                                      possible_sense)
         return sense
 
 
@@ -127,82 +170,15 @@ class MyAgent(Player):
             (A6, None), (B6, None), (C8, None)
         ]
         """
-        sense_squares = [sense_result[i][0] for i in
-                         range(len(sense_result))]  # list of specifically the squares that were sensed
-        for square, piece in sense_result:  # iterate through the sense result
-            # if the current board has a piece here, but it's the wrong piece
-            if self.current_board.piece_at(square) == None or self.current_board.piece_at(square) == piece:
-                continue
-            # check if there's another sensed square that wants the piece that's at this one
-            self.current_board.turn = not self.color
-            moves = list(self.current_board.pseudo_legal_moves)
-            for square_to, piece_to in sense_result:  # iterate through the sense results
-                # if the piece at this sensed square is also wrong but the earlier piece was right and we're not just looking at the same square
-                if self.current_board.piece_at(square_to) != piece_to and self.current_board.piece_at(
-                        square) == piece_to and square != square_to:
-                    move = chess.Move(square, square_to)
-                    # if it's a valid move and nothing is being captured, make it
-                    if move in moves and self.current_board.is_capture(move) != True:
-                        self.current_board.push(move)
-                        break
-            # check again if the current board still has a piece at this square
-            if self.current_board.piece_at(square) == None or self.current_board.piece_at(square) == piece:
-                continue
-            # if there's still a piece and it's the wrong piece, literally just look for any move that'll move it out of the sensed squares
-            self.current_board.turn = not self.color
-            moves = list(self.current_board.pseudo_legal_moves)
-            for move in moves:
-                if move.from_square == square and move.to_square not in sense_squares and self.current_board.is_capture(
-                        move) != True:
-                    self.current_board.push(move)
-                    break
-            # check once again if the current board STILL has a piece here
-            if self.current_board.piece_at(square) == None or self.current_board.piece_at(square) == piece:
-                continue
-            # alright I give up; just move this piece to any empty square on the board
-            rand_square = random.choice(chess.SQUARES)
-            while rand_square in sense_squares or self.current_board.color_at(rand_square) != None:
-                rand_square = random.choice(chess.SQUARES)
-            self.current_board.set_piece_at(rand_square, self.current_board.remove_piece_at(square))
-
-        # now that we've guaranteed every square in the sense results either has the right piece or no piece, iterate through the results again
-        for square, piece in sense_result:
-            # if there's a piece here, it's most likely the right one
-            if self.current_board.piece_at(square) != None:
-                continue
-            # look for any valid move that will place the right piece in this spot
-            self.current_board.turn = not self.color
-            moves = list(self.current_board.pseudo_legal_moves)
-            random.shuffle(moves)
-            for move in moves:
-                if move.to_square == square and self.current_board.piece_at(
-                        move.from_square) == piece and move.from_square not in sense_squares:
-                    self.current_board.push(move)
-                    break
-                if move.to_square == square and move.promotion != None and move.promotion == piece.piece_type and move.from_square not in sense_squares:
-                    self.current_board.push(move)
-                    break
-            # if the right piece is now here, great
-            if self.current_board.piece_at(square) == piece:
-                continue
-            # if there was no valid move to move the right piece here, well... uh... just randomly pick a piece of the right type and move it here
-            random_squares = list(chess.SQUARES)
-            random.shuffle(random_squares)
-            for from_square in random_squares:
-                if from_square in sense_squares:
-                    continue
-                if self.current_board.color_at(from_square) != (not self.color):
-                    continue
-                if piece.piece_type == self.current_board.piece_at(from_square).piece_type:
-                    if piece.piece_type == chess.BISHOP:
-                        from_type = (chess.square_rank(from_square) + chess.square_file(from_square)) % 2
-                        to_type = (chess.square_rank(square) + chess.square_file(square)) % 2
-                        if from_type != to_type:
-                            continue
-                    self.current_board.set_piece_at(square, self.current_board.remove_piece_at(from_square))
+        self.sense_result = sense_result
+        if self.belief is not None:
+            self.belief.sensed(sense_result)
+            self.current_board = self.belief.most_likely()
+            return
 
-        # set the current board turn back to our turn (otherwise the MCTS will get upset)
-        self.current_board.turn = self.color
+        # only the squares where the sense and the board disagree are repaired, see reconcile.py
+        reconcile(self.current_board, sense_result, self.color, self.rng)
+        self.current_board.turn = self.color  # our move next, otherwise the search plays the opponent's moves
 
     def choose_move(self, possible_moves, seconds_left):
         """
@@ -221,12 +197,150 @@ class MyAgent(Player):
         print('\--------------Choose Move--------------/')
         print(possible_moves)
         print(list(self.current_board.legal_moves))
-        search_tree = MCTS(5, self.color, self.current_board)
-        search_tree.search()
-        move = search_tree.pick_move()['move']
+        # tactical pre-pass: a capturable enemy king or a single way to save ours needs no search, and when our king
+        # is attacked only the moves that save it are searched, with the time of that smaller move count
+        move, tactic, safe = forced_move(self.current_board)
+        if move is not None:
+            print('Playing {} without a search: {}'.format(move, tactic))
+            self.kept_tree = None
+            self.reused_visits.append(0)
+            search_stats = SearchStats()
+            search_stats.best_move = move
+            self.log_search(search_stats, seconds_left, tactic)
+            self.move_number += 1
+            return move if move else None  # a null move means passing
+
+        num_moves = len(safe) if safe else len(possible_moves)
+        deadline = self.time_manager.deadline(seconds_left, self.move_number, num_moves)
+        options = {'seed': self.rng.getrandbits(32), 'history': self.history}
+        options.update(self.search_options)
+        if safe:
+            options['moves'] = safe
+        if self.belief is not None and self.candidates:
+            # one search over the likely boards, its tree follows our own moves only and is not kept
+            boards, weights = self.belief.candidates(self.candidates)
+            self.kept_tree = None
+            self.reused_visits.append(0)
+            search_tree = ISMCTS(deadline - time.time(), self.color, boards, weights, **options)
+        else:
+            # a kept subtree holds every root move, only its root statistics carry over into a restricted search
+            tree, prior_stats = self.reuse_tree(deep=not safe)
+            search_tree = MCTS(deadline - time.time(), self.color, self.current_board, workers=self.workers,
+                               tree=tree, prior_stats=prior_stats, **options)
+        search_stats = search_tree.search(deadline)
+        move = search_stats.best_move or None  # a null move means passing
+        if search_tree.tree is not None and not isinstance(search_tree, ISMCTS):
+            self.history.update(self.current_board, search_tree.tree)
+        else:
+            self.history.update_root(self.current_board, search_tree.root_stats())
+        self.log_search(search_stats, seconds_left)
+        self.move_number += 1
+        self.search_tree = search_tree if not isinstance(search_tree, ISMCTS) else None
+        self.search_board = self.current_board.copy(stack=False)
 
         return move
 
+    def log_search(self, search_stats, seconds_left, tactic=None):
+        """
+        Appends the stats of a search as one line to this game's stats file.
+
+        :param search_stats: SearchStats -- the search that chose our move
+        :param seconds_left: float -- clock before the search
+        :param tactic: str -- why the move was played without a search, None if it was searched
+        """
+        if self.stats_file is None:
+            return
+        record = {'move_number': self.move_number, 'seconds_left': seconds_left,
+                  'reused_visits': self.reused_visits[-1], 'tactic': tactic}
+        record.update(search_stats.to_dict())
+        self.stats_file.write(json.dumps(record) + '\n')
+        self.stats_file.flush()
+
+    def consistent_reply(self, reply):
+        """
+        Checks an opponent reply of the kept tree against what we observed since: where the opponent captured and what
+        the sense showed.
+
+        :param reply: chess.Move -- the reply, a null move if they passed
+        :return: chess.Board -- the board after the reply, None if the reply contradicts an observation
+        """
+        board = self.kept_board
+        captures = bool(reply) and (board.color_at(reply.to_square) == self.color or board.is_en_passant(reply))
+        if self.opponent_capture is None:
+            if captures:
+                return None
+        elif not captures or reply.to_square != self.opponent_capture:
+            return None
+        board = board.copy(stack=False)
+        board.push(reply)
+        for square, piece in self.sense_result:
+            if board.piece_at(square) != piece:
+                return None
+        return board
+
+    def reuse_tree(self, deep=True):
+        """
+        Carries the statistics of the kept tree over to this search. Of the opponent replies that agree with what we
+        observed, the most visited one that leads to the current board keeps its whole subtree. If none does, the
+        believed board differs from all of them outside what we saw: the root statistics of the consistent replies
+        whose opponent pieces stand on at most reuse_difference other squares are summed by move instead, and the
+        search starts fresh if the belief has moved further than that from all of them.
+
+        :param deep: bool -- whether a whole subtree may be reused, False when the root moves are restricted
+        :return: Tuple(Tree, dict) -- subtree to continue the search from (None to start fresh) and encoded root move
+                 -> [visits, wins] for a fresh tree
+        """
+        tree, self.kept_tree = self.kept_tree, None
+        subtree, prior_stats = None, {}
+        if tree is not None:
+            consistent, best = [], None
+            opponent = not self.color
+            for reply in tree.children(self.kept_node):
+                board = self.consistent_reply(tree.get_move(reply))
+                if board is None:
+                    continue
+                if chess.popcount(board.occupied_co[opponent] ^ self.current_board.occupied_co[opponent]) <= \
+                        self.reuse_difference:
+                    consistent.append(reply)
+                if deep and board.board_fen() == self.current_board.board_fen() and \
+                        (best is None or tree.visits[reply] > tree.visits[best]):
+                    best = reply
+            if best is not None:
+                subtree = tree.subtree(best)
+            else:
+                legal = {encode_move(move) for move in self.current_board.legal_moves}
+                for reply in consistent:
+                    for child in tree.children(reply):
+                        code = int(tree.move[child])
+                        if code in legal:
+                            stats = prior_stats.setdefault(code, [0, 0.0])
+                            stats[0] += int(tree.visits[child])
+                            stats[1] += float(tree.wins[child])
+        reused = int(subtree.visits[0]) if subtree is not None else sum(v for v, w in prior_stats.values())
+        self.reused_visits.append(reused)
+        print('Reused {} visits from the previous search'.format(reused))
+        return subtree, prior_stats
+
+    def keep_subtree(self, taken_move):
+        """
+        Keeps the last search tree and the node of the move that was actually taken, it is searched from when we know
+        how the opponent replied.
+
+        :param taken_move: chess.Move -- the move that was made, None if we passed
+        """
+        self.kept_tree = None
+        search_tree, self.search_tree = self.search_tree, None
+        if search_tree is None or search_tree.tree is None:  # root-parallel searches have no single tree
+            return
+        tree = search_tree.tree
+        code = encode_move(taken_move) if taken_move is not None else 0
+        for child in tree.children(0):
+            if tree.move[child] == code:
+                self.kept_tree, self.kept_node = tree, child
+                self.kept_board = self.search_board.copy(stack=False)
+                self.kept_board.push(taken_move if taken_move is not None else chess.Move.null())
+                return
+
     def handle_move_result(self, requested_move, taken_move, reason, captured_piece, captured_square):
         """
         This is a function called at the end of your turn/after your move was made and gives you the chance to update
@@ -238,6 +352,19 @@ class MyAgent(Player):
         :param captured_piece: bool - true if you captured your opponents piece
         :param captured_square: chess.Square - position where you captured the piece
         """
+        self.keep_subtree(taken_move)
+        if self.belief is not None:
+            self.belief.moved(requested_move, taken_move, captured_square if captured_piece else None)
+            self.current_board = self.belief.most_likely()
+            return
+
+        if requested_move is not None and taken_move is None and \
+                chess.square_file(requested_move.from_square) != chess.square_file(requested_move.to_square) and \
+                self.current_board.piece_type_at(requested_move.from_square) == chess.PAWN:
+            # a pawn capture only fails on an empty square, so whatever we believed was there has moved away. without
+            # this a failed capture of the king would be requested again and again
+            reconcile(self.current_board, [(requested_move.to_square, None)], self.color, self.rng)
+
         if taken_move is not None: # if a move was actually taken
             # if it was a valid move in our board model, do it
             self.current_board.turn = self.color
@@ -263,18 +390,18 @@ class MyAgent(Player):
                     # if there is no valid move to move the captured piece out of the way, put it on a random empty spot
                     self.current_board.turn = self.color
                     if self.current_board.is_capture(taken_move) != captured_piece:
-                        rand_square = random.choice(chess.SQUARES)
+                        rand_square = self.rng.choice(chess.SQUARES)
                         while self.current_board.color_at(rand_square) is not None:
-                            rand_square = random.choice(chess.SQUARES)
+                            rand_square = self.rng.choice(chess.SQUARES)
                         self.current_board.set_piece_at(rand_square, self.current_board.remove_piece_at(taken_move.to_square))
                         self.current_board.push(taken_move)
             # if the taken move wasn't a valid move to begin with
             else:
                 # if there is currently a piece that is occupying the square that was moved to, and it's not supposed to be captured, move it to a random empty square
                 if self.current_board.color_at(taken_move.to_square) is not None and (captured_piece is not True or self.current_board.color_at(taken_move.to_square) == self.color):
-                    rand_square = random.choice(chess.SQUARES)
+                    rand_square = self.rng.choice(chess.SQUARES)
                     while self.current_board.color_at(rand_square) is not None:
-                        rand_square = random.choice(chess.SQUARES)
+                        rand_square = self.rng.choice(chess.SQUARES)
                     self.current_board.set_piece_at(rand_square, self.current_board.remove_piece_at(taken_move.to_square))
                 # now that there is no piece at the destination square, force the taken move to occur
                 self.current_board.set_piece_at(taken_move.to_square, self.current_board.remove_piece_at(taken_move.from_square))
@@ -292,4 +419,6 @@ class MyAgent(Player):
         print('\--------------Game End--------------/')
         print(winner_color)
         print(win_reason)
-        pass
+        if self.stats_file is not None:
+            self.stats_file.close()
+            self.stats_file = None
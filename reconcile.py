@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      reconcile.py
+Authors:        Jeremy Webb
+
+Description:    Single board sense repair for MyAgent without a particle filter. The sensed window is compared with
+                the believed board as bitmasks per piece type, and only the squares that differ are worked on: the
+                opponent pieces seen where the board lacks them are matched to believed pieces of the same type by a
+                minimum cost assignment of who most plausibly moved where, and pieces believed inside the window but
+                not seen there are moved out.
+                The work grows with the number of mismatched squares, no moves are generated.
+"""
+
+import chess
+from tables import SQUARE_COLORS
+
+# extra cost of explaining a sensed piece with a believed one outside the window, which then leaves its own square
+# empty. a believed piece that the sense already showed to be elsewhere has to go somewhere anyway
+OUTSIDE_COST = 1
+
+
+def sense_diff(board, sense_result, color):
+    """
+    :param board: chess.Board -- believed board
+    :param sense_result: List(Tuple(chess.Square, chess.Piece)) -- the sense result, None for empty squares
+    :param color: chess.WHITE/chess.BLACK -- our side, only the other side's pieces are compared
+    :return: Tuple(int, List(Tuple(chess.Square, int)), List(Tuple(chess.Square, int))) -- bitmask of the sensed
+             squares, the (square, piece type) of opponent pieces sensed where the board does not have them and of
+             opponent pieces on the board that the sense did not show
+    """
+    window = 0
+    seen = [0] * 7  # opponent pieces by type inside the window
+    for square, piece in sense_result:
+        window |= chess.BB_SQUARES[square]
+        if piece is not None and piece.color != color:
+            seen[piece.piece_type] |= chess.BB_SQUARES[square]
+    missing, stale = [], []
+    for piece_type in chess.PIECE_TYPES:
+        believed = board.pieces_mask(piece_type, not color) & window
+        missing.extend((square, piece_type) for square in chess.scan_forward(seen[piece_type] & ~believed))
+        stale.extend((square, piece_type) for square in chess.scan_forward(believed & ~seen[piece_type]))
+    return window, missing, stale
+
+
+def move_cost(board, piece_type, color, source, target):
+    """
+    How far a believed piece is from having moved to a sensed square.
+
+    :param board: chess.Board -- believed board
+    :param piece_type: int -- type of the piece
+    :param color: chess.WHITE/chess.BLACK -- color of the piece
+    :param source: chess.Square -- where the piece is believed to be
+    :param target: chess.Square -- where a piece of its type was sensed
+    :return: int -- 0 for a single move, more the further it is, None if the piece can never get there
+    """
+    if piece_type == chess.BISHOP and SQUARE_COLORS[source] != SQUARE_COLORS[target]:
+        return None
+    if piece_type == chess.PAWN:
+        advance = chess.square_rank(target) - chess.square_rank(source)
+        advance = advance if color == chess.WHITE else -advance
+        # pawns only go forwards and only change files by capturing
+        if advance <= 0 or abs(chess.square_file(target) - chess.square_file(source)) > advance:
+            return None
+        return advance - 1
+    if board.attacks_mask(source) & chess.BB_SQUARES[target]:
+        return 0
+    return chess.square_distance(source, target)
+
+
+def assign(costs):
+    """
+    Minimum cost assignment of targets to distinct sources that leaves as few targets unassigned as possible. A sense
+    window has nine squares, so an exhaustive search over the sources used so far is cheap.
+
+    :param costs: List(List(int)) -- cost of every (target, source) pair, None where the source cannot be used
+    :return: List(int) -- index of the source of every target, None for targets no source is left for
+    """
+    memo = {}
+
+    def best(target, used):
+        # (unassigned, cost) of the best assignment of targets from target on, and its sources
+        if target == len(costs):
+            return (0, 0), ()
+        if (target, used) in memo:
+            return memo[target, used]
+        (unassigned, cost), rest = best(target + 1, used)
+        result = (unassigned + 1, cost), (None,) + rest
+        for source, pair_cost in enumerate(costs[target]):
+            if pair_cost is None or used >> source & 1:
+                continue
+            (unassigned, cost), rest = best(target + 1, used | 1 << source)
+            if (unassigned, cost + pair_cost) < result[0]:
+                result = (unassigned, cost + pair_cost), (source,) + rest
+        memo[target, used] = result
+        return result
+
+    return list(best(0, 0)[1])
+
+
+def reconcile(board, sense_result, color, rng):
+    """
+    Makes the board agree with the sense result by moving as few believed opponent pieces as plausible. For each
+    piece type the sensed pieces are assigned to believed pieces of that type at the least total cost (see assign),
+    and only a sensed piece that no believed piece is left for is added. Believed pieces the sense did not show move
+    to an empty square outside the window, one they attack if there is one.
+
+    :param board: chess.Board -- believed board, changed in place
+    :param sense_result: List(Tuple(chess.Square, chess.Piece)) -- the sense result, None for empty squares
+    :param color: chess.WHITE/chess.BLACK -- our side
+    :param rng: random.Random -- picks the square a believed piece leaves the window to
+    :return: int -- number of mismatched squares
+    """
+    window, missing, stale = sense_diff(board, sense_result, color)
+    if not missing and not stale:
+        return 0
+    opponent = not color
+    stale_squares = {square for square, piece_type in stale}
+
+    # moves are decided on the believed board first and then made all at once, so a piece leaving a square in the
+    # window does not change where the others could have come from
+    used = set()
+    for piece_type in {piece_type for square, piece_type in missing}:
+        targets = [square for square, target_type in missing if target_type == piece_type]
+        sources = [square for square, source_type in stale if source_type == piece_type] + \
+            list(chess.scan_forward(board.pieces_mask(piece_type, opponent) & ~window))
+        costs = []
+        for target in targets:
+            costs.append([])
+            for source in sources:
+                cost = move_cost(board, piece_type, opponent, source, target)
+                costs[-1].append(None if cost is None else cost + (source not in stale_squares) * OUTSIDE_COST)
+        used.update(sources[source] for source in assign(costs) if source is not None)
+    leaving = [(source, piece_type, board.attacks_mask(source)) for source, piece_type in stale if source not in used]
+    for source in used:
+        board.remove_piece_at(source)
+    for square, piece_type in stale:
+        board.remove_piece_at(square)
+    for target, piece_type in missing:
+        board.set_piece_at(target, chess.Piece(piece_type, opponent))
+
+    for source, piece_type, attacks in leaving:
+        empty = chess.BB_ALL & ~board.occupied & ~window
+        if piece_type == chess.PAWN:
+            empty &= ~chess.BB_BACKRANKS
+        targets = list(chess.scan_forward(attacks & empty)) or list(chess.scan_forward(empty))
+        if targets:
+            board.set_piece_at(rng.choice(targets), chess.Piece(piece_type, opponent))
+    return len(missing) + len(stale)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      rollout.py
+Authors:        Jeremy Webb
+
+Description:    Lean board used only for rollouts. Pieces are integer bitboards plus a square list, moves are 16 bit
+                codes (see tree.encode_move) and nothing is kept for undoing moves. Moves follow the recon chess
+                rules of game.py: they are generated without seeing the opponent's pieces (pawns may try to capture
+                diagonally onto any square), there is no check, sliding moves stop at the first enemy piece in the
+                way and the game ends when a king is captured.
+"""
+
+import chess
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING
+BB_SQUARES = chess.BB_SQUARES
+BB_BETWEEN = chess.BB_BETWEEN
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+DIAG_MASKS = chess.BB_DIAG_MASKS
+DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+RANK_MASKS = chess.BB_RANK_MASKS
+RANK_ATTACKS = chess.BB_RANK_ATTACKS
+FILE_MASKS = chess.BB_FILE_MASKS
+FILE_ATTACKS = chess.BB_FILE_ATTACKS
+# indexed by color, chess.BLACK is 0 and chess.WHITE is 1
+BACK_RANK = [chess.BB_RANK_8, chess.BB_RANK_1]
+LAST_RANK = [chess.BB_RANK_1, chess.BB_RANK_8]
+DOUBLE_PUSH_RANK = [chess.BB_RANK_6, chess.BB_RANK_3]  # rank a pawn reaches with its first step
+# castling as (rook square, king target) per color
+CASTLES = [((chess.H8, chess.G8), (chess.A8, chess.C8)), ((chess.H1, chess.G1), (chess.A1, chess.C1))]
+KING_START = [chess.E8, chess.E1]
+
+# lines through a square on an empty board
+DIAG_RAYS = [DIAG_ATTACKS[square][0] for square in chess.SQUARES]
+STRAIGHT_RAYS = [RANK_ATTACKS[square][0] | FILE_ATTACKS[square][0] for square in chess.SQUARES]
+PUSH_PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+CAPTURE_PROMOTIONS = (0, KNIGHT, BISHOP, ROOK, QUEEN)  # a plain diagonal move onto the last rank promotes to a queen
+
+
+def move_table(color, piece_type, square):
+    """
+    Every move a piece could request from its square if no own piece were in the way.
+
+    :param color: int -- color of the piece
+    :param piece_type: int -- type of the piece
+    :param square: int -- square the piece stands on
+    :return: Tuple(Tuple(int, int, int)) -- (code, path, right) per move: the move may be requested while no own
+             piece is on the path bitboard and, for castling, the castling rights hold the right bitboard
+    """
+    moves = []
+    if piece_type == PAWN:
+        forward = 8 if color else -8
+        to_square = square + forward
+        if not 0 <= to_square < 64:
+            return ()
+        last = BB_SQUARES[to_square] & LAST_RANK[color]
+        for promotion in (PUSH_PROMOTIONS if last else (0,)):
+            moves.append((square | to_square << 6 | promotion << 12, BB_SQUARES[to_square], 0))
+        if BB_SQUARES[to_square] & DOUBLE_PUSH_RANK[color]:
+            double = to_square + forward
+            moves.append((square | double << 6, BB_SQUARES[to_square] | BB_SQUARES[double], 0))
+        for to_square in chess.scan_forward(PAWN_ATTACKS[color][square]):
+            for promotion in (CAPTURE_PROMOTIONS if last else (0,)):
+                moves.append((square | to_square << 6 | promotion << 12, BB_SQUARES[to_square], 0))
+        return tuple(moves)
+    targets = {KNIGHT: KNIGHT_ATTACKS[square], BISHOP: DIAG_RAYS[square], ROOK: STRAIGHT_RAYS[square],
+               QUEEN: DIAG_RAYS[square] | STRAIGHT_RAYS[square], KING: KING_ATTACKS[square]}[piece_type]
+    for to_square in chess.scan_forward(targets):
+        moves.append((square | to_square << 6, BB_BETWEEN[square][to_square] | BB_SQUARES[to_square], 0))
+    if piece_type == KING and square == KING_START[color]:
+        for rook, king_to in CASTLES[color]:
+            moves.append((square | king_to << 6, BB_BETWEEN[square][rook], BB_SQUARES[rook]))
+    return tuple(moves)
+
+
+# MOVE_TABLES[color][piece_type][square], see move_table
+MOVE_TABLES = [[None] + [[move_table(color, piece_type, square) for square in chess.SQUARES]
+                         for piece_type in range(PAWN, KING + 1)] for color in (chess.BLACK, chess.WHITE)]
+
+
+class RolloutBoard:
+    """
+    Position for throwaway rollouts. Bitboards are shared by both colors like in python-chess: pieces[piece_type]
+    holds every piece of that type and occupied_co[color] every piece of a color. piece_squares[color] lists the
+    squares of a color's pieces in no particular order, so a random piece is one index away.
+    """
+
+    __slots__ = ('pieces', 'occupied_co', 'squares', 'piece_squares', 'turn', 'castling', 'ep_square')
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        :param board: chess.Board -- position to start from
+        :return: RolloutBoard
+        """
+        rollout_board = cls()
+        rollout_board.pieces = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        rollout_board.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        squares = [0] * 64
+        for piece_type in range(PAWN, KING + 1):
+            bb = rollout_board.pieces[piece_type]
+            while bb:
+                squares[(bb & -bb).bit_length() - 1] = piece_type
+                bb &= bb - 1
+        rollout_board.squares = squares
+        rollout_board.piece_squares = [list(chess.scan_forward(rollout_board.occupied_co[0])),
+                                       list(chess.scan_forward(rollout_board.occupied_co[1]))]
+        rollout_board.turn = int(board.turn)
+        rollout_board.castling = board.clean_castling_rights()
+        rollout_board.ep_square = board.ep_square
+        return rollout_board
+
+    def to_board(self):
+        """
+        :return: chess.Board -- the same position, without a move stack
+        """
+        board = chess.Board(None)
+        board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = self.pieces[1:]
+        board.occupied_co[chess.WHITE] = self.occupied_co[1]
+        board.occupied_co[chess.BLACK] = self.occupied_co[0]
+        board.occupied = self.occupied_co[0] | self.occupied_co[1]
+        board.turn = bool(self.turn)
+        board.castling_rights = self.castling
+        board.ep_square = self.ep_square
+        return board
+
+    def copy(self):
+        rollout_board = RolloutBoard()
+        rollout_board.pieces = self.pieces.copy()
+        rollout_board.occupied_co = self.occupied_co.copy()
+        rollout_board.squares = self.squares.copy()
+        rollout_board.piece_squares = [self.piece_squares[0].copy(), self.piece_squares[1].copy()]
+        rollout_board.turn = self.turn
+        rollout_board.castling = self.castling
+        rollout_board.ep_square = self.ep_square
+        return rollout_board
+
+    def captured_king(self):
+        """
+        :return: chess.WHITE/chess.BLACK -- the side whose king is gone, None if both kings are on the board
+        """
+        kings = self.pieces[KING]
+        if not kings & self.occupied_co[1]:
+            return chess.WHITE
+        if not kings & self.occupied_co[0]:
+            return chess.BLACK
+        return None
+
+    def moves(self):
+        """
+        :return: List(int) -- every move the side to move may request, encoded
+        """
+        own = self.occupied_co[self.turn]
+        tables = MOVE_TABLES[self.turn]
+        return [code for square in self.piece_squares[self.turn] for code, path, right in
+                tables[self.squares[square]][square] if not path & own and (not right or self.castling & right)]
+
+    def random_move(self, rng):
+        """
+        Draws a piece of the side to move (or a pass, drawn like a piece with one move) and one of its entries in
+        MOVE_TABLES, both uniformly, and draws again until the move may be requested.
+
+        :param rng: random.Random -- generator to draw with
+        :return: int -- the drawn move, or the null move (0)
+        """
+        random = rng.random
+        own_squares = self.piece_squares[self.turn]
+        own = self.occupied_co[self.turn]
+        tables = MOVE_TABLES[self.turn]
+        while True:
+            index = int(random() * (len(own_squares) + 1))
+            if index == len(own_squares):
+                return 0
+            square = own_squares[index]
+            candidates = tables[self.squares[square]][square]
+            code, path, right = candidates[int(random() * len(candidates))]
+            if not path & own and (not right or self.castling & right):
+                return code
+
+    def push(self, code):
+        """
+        Requests a move and plays what the referee makes of it: sliding moves and pawn double steps stop in front
+        of (or capture) the first enemy piece in the way, pawn diagonals without something to capture, blocked pawn
+        pushes and castling through pieces become a pass.
+
+        :param code: int -- an encoded move, 0 to pass
+        :return: int -- type of the piece that was captured, 0 if none
+        """
+        ep_square = self.ep_square
+        self.ep_square = None
+        us = self.turn
+        self.turn = 1 - us
+        if not code:
+            return 0
+        squares = self.squares
+        from_square = code & 63
+        to_square = (code >> 6) & 63
+        promotion = code >> 12
+        piece_type = squares[from_square]
+        capture_square = to_square
+
+        if piece_type == PAWN:
+            step = to_square - from_square
+            if step == 8 or step == -8:
+                if squares[to_square]:
+                    return 0
+            elif step == 16 or step == -16:
+                middle = from_square + step // 2
+                if squares[middle]:
+                    return 0
+                if squares[to_square]:
+                    to_square = capture_square = middle
+                else:
+                    self.ep_square = middle
+            else:
+                if not squares[to_square]:
+                    if to_square != ep_square:
+                        return 0
+                    capture_square = to_square - 8 if us else to_square + 8
+                if not promotion and BB_SQUARES[to_square] & LAST_RANK[us]:
+                    promotion = QUEEN
+        elif piece_type == KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            rook = to_square + 1 if to_square > from_square else to_square - 2
+            if BB_BETWEEN[from_square][rook] & (self.occupied_co[0] | self.occupied_co[1]):
+                return 0
+            rook_to = (from_square + to_square) // 2
+            self.castling &= ~BACK_RANK[us]
+            self._move_piece(KING, us, from_square, to_square)
+            self._move_piece(ROOK, us, rook, rook_to)
+            return 0
+        elif piece_type != KNIGHT and piece_type != KING:
+            blockers = BB_BETWEEN[from_square][to_square] & self.occupied_co[1 - us]
+            if blockers:
+                to_square = capture_square = (blockers & -blockers).bit_length() - 1 if to_square > from_square \
+                    else blockers.bit_length() - 1
+
+        pieces = self.pieces
+        occupied_co = self.occupied_co
+        captured = squares[capture_square]
+        if captured:
+            bb = BB_SQUARES[capture_square]
+            pieces[captured] ^= bb
+            occupied_co[1 - us] ^= bb
+            squares[capture_square] = 0
+            self.piece_squares[1 - us].remove(capture_square)
+        # _move_piece written out, this is the hot path of every rollout
+        move_bb = BB_SQUARES[from_square] | BB_SQUARES[to_square]
+        pieces[piece_type] ^= move_bb
+        occupied_co[us] ^= move_bb
+        squares[from_square] = 0
+        squares[to_square] = promotion or piece_type
+        own_squares = self.piece_squares[us]
+        own_squares[own_squares.index(from_square)] = to_square
+        if promotion:
+            pieces[PAWN] ^= BB_SQUARES[to_square]
+            pieces[promotion] |= BB_SQUARES[to_square]
+        if self.castling:
+            self.castling &= ~move_bb
+            if piece_type == KING:
+                self.castling &= ~BACK_RANK[us]
+            elif captured == KING:
+                self.castling &= ~BACK_RANK[1 - us]
+        return captured
+
+    def _move_piece(self, piece_type, color, from_square, to_square):
+        move_bb = BB_SQUARES[from_square] | BB_SQUARES[to_square]
+        self.pieces[piece_type] ^= move_bb
+        self.occupied_co[color] ^= move_bb
+        self.squares[from_square] = 0
+        self.squares[to_square] = piece_type
+        own_squares = self.piece_squares[color]
+        own_squares[own_squares.index(from_square)] = to_square
+
+
+def rollout(board, team, depth, rng, tactics=True, keep=None):
+    """
+    Plays random requested moves (or passes), drawn like RolloutBoard.random_move, until a king is captured or depth
+    plies have been played. With tactics a side that can capture the enemy king always does, so a hanging king
+    decides the rollout at once. With a keep table (HistoryTable.acceptance) moves are biased by rejection: a drawn
+    move or pass is kept with its keep probability, otherwise another one is drawn.
+
+    :param board: RolloutBoard -- position with both kings to play from, it is played on
+    :param team: chess.WHITE/chess.BLACK -- side the result is for
+    :param depth: int -- plies after which the rollout is cut off
+    :param rng: random.Random -- generator for the moves
+    :param tactics: bool -- capture the enemy king whenever possible instead of waiting for a random move to do it
+    :param keep: List(List(float)) -- per color, keep probability of a move at piece_type * 4096 + (code & 4095),
+                 None for unbiased moves
+    :return: Tuple(float, int) -- 1 or 0 if a king was captured (None if the rollout was cut off) and the plies
+             played
+    """
+    random = rng.random
+    push = board.push
+    pieces = board.pieces
+    squares = board.squares
+    occupied_co = board.occupied_co
+    for i in range(depth):
+        mover = board.turn
+        own = occupied_co[mover]
+        if tactics:
+            # the attack mask check of tactics.king_captures, sliders are looked up only if one stands on a line
+            # through the enemy king
+            square = (pieces[KING] & occupied_co[mover ^ 1]).bit_length() - 1
+            if own & ((KNIGHT_ATTACKS[square] & pieces[KNIGHT]) | (KING_ATTACKS[square] & pieces[KING]) |
+                      (PAWN_ATTACKS[mover ^ 1][square] & pieces[PAWN])):
+                return (1 if mover == team else 0), i + 1
+            diagonal = own & DIAG_RAYS[square] & (pieces[BISHOP] | pieces[QUEEN])
+            straight = own & STRAIGHT_RAYS[square] & (pieces[ROOK] | pieces[QUEEN])
+            if diagonal or straight:
+                occupied = own | occupied_co[mover ^ 1]
+                if diagonal & DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied] or straight & (
+                        RANK_ATTACKS[square][RANK_MASKS[square] & occupied] |
+                        FILE_ATTACKS[square][FILE_MASKS[square] & occupied]):
+                    return (1 if mover == team else 0), i + 1
+        own_squares = board.piece_squares[mover]
+        tables = MOVE_TABLES[mover]
+        accept = keep[mover] if keep is not None else None
+        while True:
+            index = int(random() * (len(own_squares) + 1))
+            if index == len(own_squares):
+                code = 0
+                # piece type 0 holds the keep probability of an unscored move
+                if accept is None or random() < accept[0]:
+                    break
+                continue
+            square = own_squares[index]
+            candidates = tables[squares[square]][square]
+            code, path, right = candidates[int(random() * len(candidates))]
+            if path & own or right and not board.castling & right:
+                continue
+            if accept is None or random() < accept[squares[square] * 4096 + (code & 4095)]:
+                break
+        if push(code) == KING:
+            return (1 if mover == team else 0), i + 1
+    return None, depth
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      search_stats.py
+Authors:        Jeremy Webb
+
+Description:    Structured record of what one MCTS search did. It is filled in as the search runs with a handful of
+                counter updates per iteration, so it can stay on during games.
+"""
+
+import json
+
+
+class SearchStats:
+    """
+    Iterations, time per phase, rollout lengths, tree shape and root visit distribution of one search call.
+    """
+
+    PHASES = ('select', 'expand', 'simulate', 'backprop')
+
+    def __init__(self):
+        self.best_move = None
+        self.iterations = 0
+        self.elapsed = 0.0
+        self.phase_times = dict.fromkeys(self.PHASES, 0.0)
+        self.rollout_lengths = []  # number of rollouts that ended after i plies, at index i
+        self.root_visits = {}  # uci of every tried root move -> visits
+        self.tree = {}  # MCTS.stats() at the end of the search
+
+    @property
+    def iterations_per_second(self):
+        return self.iterations / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def nodes(self):
+        return self.tree.get('nodes', 0)
+
+    @property
+    def max_depth(self):
+        return len(self.tree.get('depth_histogram', [])) - 1
+
+    def add_iteration(self, select, expand, simulate, backprop, plies):
+        """
+        Counts one iteration of a single process search.
+
+        :param select: float -- seconds spent selecting
+        :param expand: float -- seconds spent expanding
+        :param simulate: float -- seconds spent in the rollout
+        :param backprop: float -- seconds spent backing the result up
+        :param plies: int -- plies the iteration's rollout played
+        """
+        self.iterations += 1
+        times = self.phase_times
+        times['select'] += select
+        times['expand'] += expand
+        times['simulate'] += simulate
+        times['backprop'] += backprop
+        self.add_rollout(plies)
+
+    def add_rollout(self, plies):
+        """
+        :param plies: int -- plies the rollout played before it ended or was cut off
+        """
+        lengths = self.rollout_lengths
+        if plies >= len(lengths):
+            lengths.extend([0] * (plies + 1 - len(lengths)))
+        lengths[plies] += 1
+
+    def merge(self, other):
+        """
+        Adds the counters of another search, e.g. a worker of a root-parallel search. Time is not added up because the
+        workers run at the same time.
+
+        :param other: SearchStats -- stats to add
+        """
+        self.iterations += other.iterations
+        for phase in self.PHASES:
+            self.phase_times[phase] += other.phase_times[phase]
+        for plies, count in enumerate(other.rollout_lengths):
+            if count:
+                self.add_rollout(plies)
+                self.rollout_lengths[plies] += count - 1
+
+    def to_dict(self):
+        """
+        :return: dict -- JSON serializable copy of the stats
+        """
+        return {'best_move': self.best_move.uci() if self.best_move is not None else None,
+                'iterations': self.iterations, 'elapsed': self.elapsed,
+                'iterations_per_second': self.iterations_per_second, 'phase_times': dict(self.phase_times),
+                'rollout_lengths': list(self.rollout_lengths), 'nodes': self.nodes, 'max_depth': self.max_depth,
+                'root_visits': dict(self.root_visits), 'tree': dict(self.tree)}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def __repr__(self):
+        return 'SearchStats({} iterations, {:.1f} it/s, {} nodes, depth {}, best {})'.format(
+            self.iterations, self.iterations_per_second, self.nodes, self.max_depth, self.best_move)
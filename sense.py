@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      sense.py
+Authors:        Jeremy Webb
+
+Description:    Sense selection by expected information gain. A sense returns the 3x3 window around its centre
+                exactly, so what we expect to learn from it is the entropy of the window's contents over the
+                candidate boards. All 36 inner centres are scored at once: every window of every board is packed
+                into one integer, each centre's integers are sorted and the weights of equal ones are summed.
+"""
+
+import numpy as np
+import chess
+from array_board import board_array
+from tables import INNER_SQUARES, SENSE_SQUARES, SENSE_MASKS
+
+WINDOWS = np.array([SENSE_SQUARES[centre] for centre in INNER_SQUARES])  # (36, 9), three rows of three squares
+WINDOW_MASKS = [SENSE_MASKS[centre] for centre in INNER_SQUARES]
+STATES = 13  # piece codes -6..6
+
+
+def window_entropy(boards, weights):
+    """
+    :param boards: np.ndarray -- (N, 64 or more) int8 candidate boards in the layout of array_board.py
+    :param weights: np.ndarray -- probability of every board, summing to one
+    :return: np.ndarray -- entropy in bits of the contents of every window of INNER_SQUARES
+    """
+    count, n = len(INNER_SQUARES), len(boards)
+    columns = np.ascontiguousarray(boards[:, :64].T, dtype=np.int64) + STATES // 2  # (64, n), 0..12
+    # a window is three rows of three squares: pack the rows in base 13 first, then the windows from them
+    rows = (columns[:-2] * STATES + columns[1:-1]) * STATES + columns[2:]  # row centred on square + 1
+    keys = (rows[WINDOWS[:, 0]] * STATES ** 3 + rows[WINDOWS[:, 3]]) * STATES ** 3 + rows[WINDOWS[:, 6]]
+    # sort each centre's windows with the board index in the low bits, a plain sort is faster than argsort
+    shift = max(int(n - 1).bit_length(), 1)  # windows are below 13 ** 9 < 2 ** 34, both fit in 63 bits
+    keys = np.sort((keys << shift) | np.arange(n), axis=1)
+    order = keys & ((1 << shift) - 1)
+    keys >>= shift
+    starts = np.ones(keys.shape, dtype=np.bool_)
+    starts[:, 1:] = keys[:, 1:] != keys[:, :-1]
+    groups = np.cumsum(starts.reshape(-1)) - 1  # one group per distinct window of each centre
+    probabilities = np.bincount(groups, weights=weights[order].reshape(-1))
+    information = -probabilities * np.log2(np.maximum(probabilities, 1e-300))
+    centres = np.nonzero(starts)[0]
+    return np.bincount(centres, weights=information, minlength=count)
+
+
+def choose_sense(boards, weights, own, rng, possible_sense=None, max_own=4):
+    """
+    The centre whose window we know least about. Windows covering more than max_own of our own pieces are skipped
+    while there are others, ties are broken at random.
+
+    :param boards: np.ndarray -- (N, 64 or more) int8 candidate boards, or a single chess.Board
+    :param weights: np.ndarray -- probability of every board, None for a single board
+    :param own: int -- bitboard of our pieces
+    :param rng: random.Random -- for the tie break
+    :param possible_sense: List(chess.Square) -- allowed centres, all of INNER_SQUARES by default
+    :param max_own: int -- most of our own pieces a window should cover
+    :return: Tuple(chess.Square, float) -- the centre and the entropy of its window in bits
+    """
+    if isinstance(boards, chess.Board):
+        boards, weights = board_array(boards)[None], np.ones(1)
+    entropy = window_entropy(boards, weights)
+    allowed = set(INNER_SQUARES if possible_sense is None else possible_sense)
+    indices = [i for i, centre in enumerate(INNER_SQUARES) if centre in allowed] or list(range(len(INNER_SQUARES)))
+    few_own = [i for i in indices if chess.popcount(WINDOW_MASKS[i] & own) <= max_own]
+    indices = few_own or indices
+    best = max(entropy[i] for i in indices)
+    index = rng.choice([i for i in indices if entropy[i] >= best - 1e-9])
+    return INNER_SQUARES[index], float(entropy[index])
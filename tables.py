@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      tables.py
+Authors:        Jeremy Webb
+
+Description:    Square geometry computed once at import and shared by the referee (game.py), the agent and the
+                array code: sense windows, pawn attacks, rays, knight jumps and the back ranks. Every list is clipped
+                at the board's edges, so callers index a table instead of stepping over ranks and files themselves.
+"""
+
+import chess
+
+# ray directions as (file step, rank step): N, NE, E, SE, S, SW, W, NW
+DIRECTIONS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+ORTHOGONAL = (0, 2, 4, 6)
+DIAGONAL = (1, 3, 5, 7)
+KNIGHT_STEPS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+
+
+def step(square, file_step, rank_step):
+    """
+    :param square: chess.Square -- square to start from
+    :param file_step: int -- files to move, positive towards the h file
+    :param rank_step: int -- ranks to move, positive towards the 8th rank
+    :return: chess.Square -- the square reached, None if it is off the board
+    """
+    file, rank = chess.square_file(square) + file_step, chess.square_rank(square) + rank_step
+    return chess.square(file, rank) if 0 <= file < 8 and 0 <= rank < 8 else None
+
+
+ALL_SQUARES = frozenset(chess.SQUARES)
+# squares whose 3x3 window lies on the board, the useful sense centres
+INNER_SQUARES = [square for square in chess.SQUARES if 0 < chess.square_file(square) < 7 and
+                 0 < chess.square_rank(square) < 7]
+# SENSE_SQUARES[square] -- the window a sense around square returns, top rank first and a to h within a rank
+SENSE_SQUARES = [[target for rank_step in (1, 0, -1) for file_step in (-1, 0, 1)
+                  for target in [step(square, file_step, rank_step)] if target is not None] for square in chess.SQUARES]
+SENSE_MASKS = [sum(chess.BB_SQUARES[target] for target in window) for window in SENSE_SQUARES]
+# PAWN_ATTACK_SQUARES[color][square] -- squares a pawn of color on square captures on, chess.BLACK = 0
+PAWN_ATTACK_SQUARES = [[list(chess.scan_forward(chess.BB_PAWN_ATTACKS[color][square])) for square in chess.SQUARES]
+                       for color in (chess.BLACK, chess.WHITE)]
+# RAY_SQUARES[square][direction] -- the squares along a direction of DIRECTIONS, nearest first
+RAY_SQUARES = [[[target for k in range(1, 8) for target in [step(square, f * k, r * k)] if target is not None]
+                for f, r in DIRECTIONS] for square in chess.SQUARES]
+# KNIGHT_SQUARES[square][j] -- the square of the j-th jump of KNIGHT_STEPS, None if it leaves the board
+KNIGHT_SQUARES = [[step(square, f, r) for f, r in KNIGHT_STEPS] for square in chess.SQUARES]
+BACK_RANK_SQUARES = frozenset(chess.scan_forward(chess.BB_BACKRANKS))
+SQUARE_COLORS = [(chess.square_rank(square) + chess.square_file(square)) % 2 for square in chess.SQUARES]
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      tactics.py
+Authors:        Jeremy Webb
+
+Description:    Attack mask checks for the two tactics that decide recon chess games on the spot: a king that can be
+                captured right now, and a king under attack with only one way out. There is no check in recon
+                chess, so neither is found by python-chess' legality and random play only stumbles upon them.
+"""
+
+import chess
+
+
+def king_captures(board):
+    """
+    Moves of the side to move that capture the enemy king. Every attacker reaches the king: a slide is only stopped
+    early by an enemy piece, and with the full board known the first one on an attacking line is the king itself.
+
+    :param board: chess.Board -- position with the side to move
+    :return: List(chess.Move) -- the capturing moves, empty if the enemy king is not attacked
+    """
+    king = board.kings & board.occupied_co[not board.turn]
+    if not king:
+        return []
+    square = chess.msb(king)
+    promotes = bool(chess.BB_SQUARES[square] & chess.BB_BACKRANKS)
+    return [chess.Move(attacker, square, chess.QUEEN if promotes and board.pawns & chess.BB_SQUARES[attacker] else None)
+            for attacker in chess.scan_reversed(board.attackers_mask(board.turn, square))]
+
+
+def king_attacked(board, color):
+    """
+    :param board: chess.Board -- position to check
+    :param color: chess.WHITE/chess.BLACK -- side whose king is checked
+    :return: bool -- True if the other side could capture color's king with its next move
+    """
+    king = board.kings & board.occupied_co[color]
+    return bool(king) and bool(board.attackers_mask(not color, chess.msb(king)))
+
+
+def safe_moves(board):
+    """
+    :param board: chess.Board -- position with the side to move
+    :return: List(chess.Move) -- the moves and the pass (null move) after which the enemy cannot capture our king
+    """
+    color = board.turn
+    safe = []
+    for move in list(board.pseudo_legal_moves) + [chess.Move.null()]:
+        board.push(move)
+        if not king_attacked(board, color):
+            safe.append(move)
+        board.pop()
+    return safe
+
+
+def forced_move(board):
+    """
+    The tactical pre-pass run before a search.
+
+    :param board: chess.Board -- position with the side to move
+    :return: Tuple(chess.Move, str, List(chess.Move)) -- move to play without searching (None if a search is needed),
+             why ('king capture' or 'only escape') and, when our king is attacked, the moves that save it (None if it
+             is not attacked)
+    """
+    captures = king_captures(board)
+    if captures:
+        return captures[0], 'king capture', None
+    if not king_attacked(board, board.turn):
+        return None, None, None
+    safe = safe_moves(board)
+    if len(safe) == 1:
+        return safe[0], 'only escape', safe
+    return None, None, safe
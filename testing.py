@@ -2,14 +2,15 @@ from mcts import MCTS
 import chess
 
 search_tree = MCTS(15, 1, chess.Board())
-search_tree.search()
-print(search_tree.pick_move()['move'])
+search_stats = search_tree.search()
+print(search_stats)
+print(search_stats.to_dict())
 
 
-def print_tree(root, i=0):
+def print_tree(tree, node=0, i=0):
     print('layer: ' + str(i))
-    print(root['state'].fen())
-    print(root['num_wins'], root['num_sims'])
+    print(tree.get_move(node))
+    print(tree.wins[node], tree.visits[node])
     j = i + 1
-    for child in root['children']:
-        print_tree(child, j)
\ No newline at end of file
+    for child in tree.children(node):
+        print_tree(tree, child, j)
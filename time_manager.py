@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      time_manager.py
+Authors:        Jeremy Webb
+
+Description:    Turns the clock into a per-move search deadline for MyAgent.
+"""
+
+import time
+
+
+class TimeManager:
+    """
+    Splits the remaining clock evenly over the moves we still expect to play, scaled by how many moves the position
+    offers, and keeps a reserve for sensing and board updates.
+    """
+
+    def __init__(self, expected_moves=50, min_moves_left=10, reserve=10.0, min_time=0.1, max_fraction=0.1,
+                 typical_branching=30):
+        """
+        :param expected_moves: int -- number of our moves we plan the clock for
+        :param min_moves_left: int -- never plan for fewer moves than this, so long games do not flag
+        :param reserve: float -- seconds kept back for everything that is not the search
+        :param min_time: float -- shortest search we allow
+        :param max_fraction: float -- longest search as a fraction of the clock
+        :param typical_branching: int -- number of moves that gets the base allocation
+        """
+        self.expected_moves = expected_moves
+        self.min_moves_left = min_moves_left
+        self.reserve = reserve
+        self.min_time = min_time
+        self.max_fraction = max_fraction
+        self.typical_branching = typical_branching
+
+    def allocate(self, seconds_left, move_number, num_moves):
+        """
+        :param seconds_left: float -- seconds left on our clock
+        :param move_number: int -- how many moves we have made so far
+        :param num_moves: int -- number of moves available in the position
+        :return: float -- seconds to spend searching this move
+        """
+        moves_left = max(self.expected_moves - move_number, self.min_moves_left)
+        base = max(seconds_left - self.reserve, 0) / moves_left
+        complexity = min(max(num_moves / self.typical_branching, 0.5), 1.5)
+        return max(min(base * complexity, self.max_fraction * seconds_left), self.min_time)
+
+    def deadline(self, seconds_left, move_number, num_moves):
+        """
+        :return: float -- time.time() the search for this move should stop at
+        """
+        return time.time() + self.allocate(seconds_left, move_number, num_moves)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      transposition.py
+Authors:        Jeremy Webb
+
+Description:    Fixed size transposition table for the MCTS. Positions are keyed by their Zobrist hash so nodes that
+                reach the same position through different move orders (null moves make this very common) share one
+                set of visit and win statistics.
+"""
+
+import numpy as np
+
+
+class TranspositionTable:
+    """
+    Two-way set associative table. A key may live in slot `key & mask` or its neighbour `slot ^ 1`; when both are
+    taken by other positions the one with fewer visits is evicted.
+    """
+
+    def __init__(self, size=2 ** 16):
+        """
+        :param size: int -- number of entries, rounded up to a power of two
+        """
+        size = 1 << max(1, int(size - 1).bit_length())
+        self.mask = size - 1
+        self.keys = np.zeros(size, dtype=np.uint64)
+        self.visits = np.zeros(size, dtype=np.int32)
+        self.wins = np.zeros(size, dtype=np.float64)
+        self.lookups = 0
+        self.hits = 0
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.visits.nbytes + self.wins.nbytes
+
+    def find(self, key):
+        """
+        :param key: int -- Zobrist hash of a position
+        :return: int -- slot holding the key, -1 if it is not in the table
+        """
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            return slot
+        if self.keys[slot ^ 1] == key:
+            return slot ^ 1
+        return -1
+
+    def store(self, key):
+        """
+        Looks a position up, claiming a slot for it if it is not in the table yet.
+
+        :param key: int -- Zobrist hash of a position
+        :return: int -- slot holding the key
+        """
+        self.lookups += 1
+        slot = self.find(key)
+        if slot != -1:
+            self.hits += 1
+            return slot
+        slot = key & self.mask
+        if self.visits[slot ^ 1] < self.visits[slot]:
+            slot ^= 1
+        self.keys[slot] = key
+        self.visits[slot] = 0
+        self.wins[slot] = 0
+        return slot
+
+    def update(self, key, result):
+        """
+        Adds a visit to a position if it is still in the table.
+
+        :param key: int -- Zobrist hash of a position
+        :param result: float -- result for the side that moved into the position
+        """
+        slot = self.find(key)
+        if slot != -1:
+            self.visits[slot] += 1
+            self.wins[slot] += result
+
+    def lookup_many(self, keys):
+        """
+        Vectorized find over an array of keys.
+
+        :param keys: np.ndarray -- uint64 Zobrist hashes
+        :return: np.ndarray -- slot of every key, -1 where the key is not in the table
+        """
+        slots = (keys & np.uint64(self.mask)).astype(np.int64)
+        slots = np.where(self.keys[slots] == keys, slots, slots ^ 1)
+        return np.where(self.keys[slots] == keys, slots, -1)
+
+    def stats(self):
+        """
+        :return: dict -- lookups, hits, hit rate and bytes held by the table
+        """
+        return {'tt_lookups': self.lookups, 'tt_hits': self.hits,
+                'tt_hit_rate': self.hits / self.lookups if self.lookups else 0.0, 'tt_bytes': self.nbytes}
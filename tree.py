@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+File Name:      tree.py
+Authors:        Jeremy Webb
+
+Description:    Array-backed search tree used by the MCTS. Every node lives at an integer index and its statistics
+                are stored in NumPy arrays (struct-of-arrays) that grow in chunks, instead of one dict per node.
+"""
+
+import chess
+import numpy as np
+
+
+def encode_move(move):
+    """
+    Packs a move into a 16 bit integer. The null move is encoded as 0.
+
+    :param move: chess.Move -- the move to encode
+    :return: int -- from_square | to_square << 6 | promotion << 12
+    """
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    """
+    Inverse of encode_move.
+
+    :param code: int -- an encoded move
+    :return: chess.Move
+    """
+    code = int(code)
+    if code == 0:
+        return chess.Move.null()
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+class Tree:
+    """
+    Struct-of-arrays search tree. Node 0 is the root. When a node is first expanded a contiguous block of slots is
+    reserved for all of its moves, so the statistics of a node's children sit next to each other and can be scored
+    in one vectorized expression. The first num_children slots of a block have been expanded, the rest are the
+    untried moves in expansion order.
+    """
+
+    CHUNK = 4096
+
+    def __init__(self, capacity=CHUNK):
+        self.size = 0
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.wins = np.zeros(capacity, dtype=np.float64)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int16)  # expanded children
+        self.num_moves = np.full(capacity, -1, dtype=np.int16)  # size of the child block, -1 before expansion
+        self.move = np.zeros(capacity, dtype=np.uint16)
+        self.color = np.zeros(capacity, dtype=np.bool_)  # side that made the move leading into the node
+        self.key = np.zeros(capacity, dtype=np.uint64)  # Zobrist hash of the node's position, 0 if not hashed
+        self.depth = np.zeros(capacity, dtype=np.int16)
+
+    @property
+    def capacity(self):
+        return len(self.visits)
+
+    @property
+    def nbytes(self):
+        """
+        :return: int -- bytes held by the statistic arrays
+        """
+        return sum(getattr(self, name).nbytes for name in self._arrays())
+
+    def _arrays(self):
+        return ('visits', 'wins', 'parent', 'first_child', 'num_children', 'num_moves', 'move', 'color', 'key', 'depth')
+
+    def _grow(self, needed):
+        extra = -(-(self.size + needed - self.capacity) // self.CHUNK) * self.CHUNK
+        for name in self._arrays():
+            array = getattr(self, name)
+            grown = np.zeros(len(array) + extra, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+        self._clear(self.capacity - extra, self.capacity)
+
+    def add_root(self, color, key=0):
+        """
+        :param color: bool -- the side that made the move leading into the root (not the side to move)
+        :param key: int -- Zobrist hash of the root position
+        :return: int -- index of the root
+        """
+        if self.size == self.capacity:
+            self._grow(1)
+        self.size = 1
+        self.color[0] = color
+        self.key[0] = key
+        return 0
+
+    def add_children(self, node, moves):
+        """
+        Reserves the child block of a node. Nodes only store the move leading into them, boards are rebuilt by
+        replaying moves from the root.
+
+        :param node: int -- index of the node being expanded
+        :param moves: List(chess.Move) -- the node's moves, in the order they will be expanded. An empty list marks the
+                      node as terminal
+        :return: int -- index of the first child
+        """
+        if self.size + len(moves) > self.capacity:
+            self._grow(len(moves))
+        start = self.size
+        end = start + len(moves)
+        self.size = end
+        self.parent[start:end] = node
+        self.color[start:end] = not self.color[node]
+        self.depth[start:end] = self.depth[node] + 1
+        self.move[start:end] = [encode_move(move) for move in moves]
+        self.first_child[node] = start
+        self.num_moves[node] = len(moves)
+        return start
+
+    def children(self, node):
+        """
+        :param node: int -- index of a node
+        :return: range -- indices of the node's expanded children
+        """
+        start = self.first_child[node]
+        return range(start, start + self.num_children[node]) if start != -1 else range(0)
+
+    def get_move(self, node):
+        return decode_move(self.move[node])
+
+    def subtree(self, node):
+        """
+        Copies the subtree below a node into a new tree with that node as its root. Used to carry search statistics
+        over to the next turn.
+
+        :param node: int -- index of the new root
+        :return: Tree
+        """
+        # breadth first, copying whole child blocks so they stay contiguous
+        order = [node]
+        i = 0
+        while i < len(order):
+            start = self.first_child[order[i]]
+            if start != -1:
+                order.extend(range(start, start + self.num_moves[order[i]]))
+            i += 1
+        order = np.array(order, dtype=np.int64)
+        size = len(order)
+        # index -1 maps to -1 and nodes outside the subtree are cut off as well
+        remap = np.full(self.size + 1, -1, dtype=np.int32)
+        remap[order] = np.arange(size, dtype=np.int32)
+
+        tree = Tree(capacity=-(-size // self.CHUNK) * self.CHUNK)
+        tree.size = size
+        for name in self._arrays():
+            getattr(tree, name)[:size] = getattr(self, name)[order]
+        for name in ('parent', 'first_child'):
+            getattr(tree, name)[:size] = remap[getattr(tree, name)[:size]]
+        tree.parent[0] = -1
+        tree.depth[:size] -= tree.depth[0]
+        return tree
+
+    def depth_histogram(self):
+        """
+        :return: List(int) -- number of visited nodes at every depth, the root is depth 0
+        """
+        return np.bincount(self.depth[:self.size][self.visits[:self.size] > 0]).tolist()
+
+    @property
+    def bytes_per_node(self):
+        return sum(getattr(self, name).itemsize for name in self._arrays())
+
+    def prune(self, target_size, protect):
+        """
+        Collapses the least visited subtrees until at most target_size slots are in use, then compacts the
+        remaining nodes to the front of the same arrays so their storage is recycled. Collapsed nodes keep their
+        statistics and become unexpanded leaves.
+
+        :param target_size: int -- slots that may stay in use
+        :param protect: List(int) -- nodes whose ancestors must not be collapsed (e.g. the node being expanded)
+        :return: np.ndarray -- new index of every old node, -1 for nodes that were removed
+        """
+        size = self.size
+        visits = self.visits[:size]
+        parent = self.parent[:size]
+        depth = self.depth[:size]
+        levels = [np.nonzero(depth == d)[0] for d in range(1, int(depth.max()) + 1)]
+
+        protected = np.zeros(size, dtype=np.bool_)
+        for node in protect:
+            while node != -1:
+                protected[node] = True
+                node = parent[node]
+        candidates = (self.num_moves[:size] > 0) & ~protected
+
+        def kept(threshold):
+            collapsed = candidates & (visits <= threshold)
+            alive = np.zeros(size, dtype=np.bool_)
+            alive[0] = True
+            # children always sit at a higher depth than their parent, so one pass per level settles everything
+            for level in levels:
+                alive[level] = alive[parent[level]] & ~collapsed[parent[level]]
+            return alive, collapsed
+
+        # smallest visit threshold that brings the tree under the target
+        thresholds = np.unique(visits[candidates])
+        if len(thresholds) == 0:
+            return np.arange(size, dtype=np.int32)
+        low, high = 0, len(thresholds) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if np.count_nonzero(kept(thresholds[middle])[0]) <= target_size:
+                high = middle
+            else:
+                low = middle + 1
+        alive, collapsed = kept(thresholds[low])
+
+        # blocks are kept or dropped whole and parents come before their children, so keeping the surviving
+        # nodes in index order keeps every block contiguous
+        order = np.nonzero(alive)[0]
+        remap = np.full(size + 1, -1, dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        collapsed = collapsed[order]
+        for name in self._arrays():
+            array = getattr(self, name)
+            array[:len(order)] = array[order]
+        new_size = len(order)
+        self.parent[:new_size] = remap[self.parent[:new_size]]
+        self.first_child[:new_size] = remap[self.first_child[:new_size]]
+        self.first_child[:new_size][collapsed] = -1
+        self.num_children[:new_size][collapsed] = 0
+        self.num_moves[:new_size][collapsed] = -1
+        self._clear(new_size, size)
+        self.size = new_size
+        return remap[:size]
+
+    def _clear(self, start, end):
+        # recycled slots must look like freshly allocated ones
+        for name in self._arrays():
+            getattr(self, name)[start:end] = 0
+        self.parent[start:end] = -1
+        self.first_child[start:end] = -1
+        self.num_moves[start:end] = -1